@@ -0,0 +1,215 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+import telemetry
+
+# --- CONFIGURATION ---
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "16"))       # Requests running HybridRAG.ask at once
+MAX_QUEUE = int(os.getenv("MAX_QUEUE", "64"))               # Requests allowed to wait for a slot
+BATCH_QUEUE_SHARE = 0.25                                    # Batch work may fill at most this much of the queue
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "30"))  # Seconds from arrival, queueing included
+DISCONNECT_POLL = 0.25                                      # Seconds between client disconnect checks
+
+# Lower value = served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing; `status` is 503 (server full) or 429 (batch over its share)."""
+
+    def __init__(self, status, retry_after, reason):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class RequestCancelled(Exception):
+    pass
+
+
+class RequestContext:
+    """Deadline + cancellation flag for one request, checked by the pipeline between stages."""
+
+    def __init__(self, deadline_seconds=REQUEST_DEADLINE):
+        self.deadline = time.monotonic() + deadline_seconds
+        self.cancelled = threading.Event()   # Set from the event loop, read from worker threads
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def check(self, stage):
+        if self.cancelled.is_set():
+            raise RequestCancelled(f"client went away before '{stage}'")
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"deadline passed before '{stage}'")
+
+
+_current_request = contextvars.ContextVar("rag_request", default=None)
+
+
+def current_request():
+    return _current_request.get()
+
+
+def check_deadline(stage):
+    """Cancellation point: no-op outside an admitted request (CLI, batch worker threads)."""
+    request = _current_request.get()
+    if request is not None:
+        request.check(stage)
+
+
+class AdmissionController:
+    """
+    Bounded in-flight work with a small priority queue in front of it.
+    Full queue -> fail fast with Retry-After instead of letting latency grow without bound;
+    interactive waiters always take a freed slot before batch ones, and may push batch waiters out.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_queue=MAX_QUEUE):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiters = []            # heap of [priority, seq, future]
+        self.seq = itertools.count()
+        self.loop = None
+        self.service_seconds = 1.0   # EWMA of time a request holds a slot, for Retry-After
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0, "expired_in_queue": 0, "evicted": 0}
+
+    def _queue_limit(self, priority):
+        return self.max_queue if priority == 0 else max(1, int(self.max_queue * BATCH_QUEUE_SHARE))
+
+    def retry_after(self):
+        waves = (len(self.waiters) + 1) / self.max_in_flight
+        return max(1, math.ceil(self.service_seconds * waves))
+
+    def _update_gauges(self):
+        telemetry.QUEUE_DEPTH.labels("admission_waiting").set(len(self.waiters))
+        telemetry.QUEUE_DEPTH.labels("admission_running").set(self.in_flight)
+
+    def _reject(self, priority_name, status, reason):
+        self.stats["rejected"] += 1
+        telemetry.record_rejection(priority_name, reason)
+        return Overloaded(status, self.retry_after(), reason)
+
+    async def acquire(self, priority_name, context):
+        """Waits for a slot until the request's deadline; returns the time the slot was granted."""
+        self.loop = asyncio.get_running_loop()
+        priority = PRIORITIES.get(priority_name, PRIORITIES["interactive"])
+
+        if self.in_flight < self.max_in_flight and not self.waiters:
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            self._update_gauges()
+            return time.monotonic()
+
+        queued_at_level = sum(1 for w in self.waiters if w[0] == priority)
+        if queued_at_level >= self._queue_limit(priority):
+            raise self._reject(priority_name, 429 if priority else 503, "queue_full")
+        if len(self.waiters) >= self.max_queue:
+            # Interactive arrival, queue full of mixed work: the newest batch waiter makes room
+            victim = max((w for w in self.waiters if w[0] > priority), default=None, key=lambda w: (w[0], w[1]))
+            if victim is None:
+                raise self._reject(priority_name, 503, "queue_full")
+            self.waiters.remove(victim)
+            heapq.heapify(self.waiters)
+            self.stats["evicted"] += 1
+            victim[2].set_exception(self._reject("batch", 429, "evicted_by_interactive"))
+
+        future = self.loop.create_future()
+        entry = [priority, next(self.seq), future]
+        heapq.heappush(self.waiters, entry)
+        self.stats["queued"] += 1
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=max(0.0, context.remaining()))
+        except asyncio.TimeoutError:
+            if future.done() and not future.exception():
+                self.release(0.0)   # Granted just as we gave up; hand the slot on
+            elif entry in self.waiters:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+            self.stats["expired_in_queue"] += 1
+            self._update_gauges()
+            raise self._reject(priority_name, 503, "deadline_in_queue")
+        except asyncio.CancelledError:
+            if future.done() and not future.exception():
+                self.release(0.0)
+            elif entry in self.waiters:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+            self._update_gauges()
+            raise
+        self.stats["admitted"] += 1
+        return time.monotonic()
+
+    def release(self, held_seconds):
+        """Frees a slot; safe to call from worker threads (streamed batch responses)."""
+        if self.loop and self.loop.is_running() and not self._on_loop():
+            self.loop.call_soon_threadsafe(self.release, held_seconds)
+            return
+        if held_seconds:
+            self.service_seconds = 0.8 * self.service_seconds + 0.2 * held_seconds
+        # The slot passes straight to the best waiter, so in_flight only drops if nobody waits
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(True)
+                self._update_gauges()
+                return
+        self.in_flight -= 1
+        self._update_gauges()
+
+    def _on_loop(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    async def submit(self, request, priority_name, context, func, *args, **kwargs):
+        """
+        Admits, then runs func in a worker thread under `context`. Gives up at the deadline or when
+        the client disconnects; the thread stops at its next check_deadline() and only then frees
+        the slot, so the in-flight limit always bounds real work.
+        """
+        await self.acquire(priority_name, context)
+        started = time.monotonic()
+
+        def call():
+            token = _current_request.set(context)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current_request.reset(token)
+
+        work = asyncio.ensure_future(asyncio.to_thread(call))
+        work.add_done_callback(lambda f: self.release(time.monotonic() - started))
+        try:
+            while True:
+                done, _ = await asyncio.wait({work}, timeout=min(DISCONNECT_POLL, max(0.0, context.remaining())))
+                if done:
+                    return work.result()
+                if context.remaining() <= 0:
+                    context.cancelled.set()
+                    raise DeadlineExceeded("request deadline passed")
+                if await request.is_disconnected():
+                    context.cancelled.set()
+                    raise RequestCancelled("client disconnected")
+        finally:
+            if not work.done():
+                # Nobody will read the abandoned result; retrieve its error so asyncio doesn't log it
+                work.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def summary(self):
+        return dict(self.stats, in_flight=self.in_flight, waiting=len(self.waiters),
+                    max_in_flight=self.max_in_flight, max_queue=self.max_queue,
+                    service_seconds=round(self.service_seconds, 3))
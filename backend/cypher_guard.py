@@ -0,0 +1,124 @@
+import re
+
+# --- CONFIGURATION ---
+FULLTEXT_INDEX = "entity_name_fulltext"
+# Must match data_ingestion/graph_loader.py, which creates it at load time as well
+ENSURE_FULLTEXT_INDEX = f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS FOR (n:Entity) ON EACH [n.name]"
+RESULT_LIMIT = 50         # Rows any generated query may return
+CANDIDATE_LIMIT = 25      # Entities taken from the full-text index per rewritten predicate
+
+# toLower(e.name) CONTAINS toLower('kw') | toLower(e.name) CONTAINS 'kw' | e.name CONTAINS 'kw'
+CONTAINS_PREDICATE = re.compile(
+    r"(?:toLower\(\s*(?P<var1>\w+)\.name\s*\)|(?P<var2>\w+)\.name)\s+CONTAINS\s+"
+    r"(?:toLower\(\s*(?P<q1>['\"])(?P<kw1>[^'\"]*)(?P=q1)\s*\)|(?P<q2>['\"])(?P<kw2>[^'\"]*)(?P=q2))",
+    re.I,
+)
+# Clauses after which a variable bound up front might not be the one the predicate filters
+UNSAFE_CLAUSES = re.compile(r"\b(WITH|UNION|CALL|OPTIONAL\s+MATCH|FOREACH|UNWIND)\b|\bOR\b|\bNOT\b", re.I)
+RETURN_CLAUSE = re.compile(r"\bRETURN\b", re.I)
+LIMIT_CLAUSE = re.compile(r"\bLIMIT\s+(\d+)\s*;?\s*$", re.I)
+LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def lucene_query(keyword):
+    """Every word as a prefix term: "arjun meh" finds "Arjun Mehta", "nova" finds "NovaTech"."""
+    # Wildcard terms skip the analyzer, so lowercase them like the indexed tokens
+    words = [LUCENE_SPECIAL.sub(r"\\\1", w) for w in keyword.lower().split() if w]
+    return " AND ".join(f"{w}*" for w in words)
+
+
+def drop_predicate(query, span):
+    """Removes one WHERE conjunct, tidying the surrounding AND / WHERE."""
+    start, end = span
+    before, after = query[:start], query[end:]
+    and_before = re.search(r"\s+AND\s*$", before, re.I)
+    and_after = re.match(r"\s*AND\s+", after, re.I)
+    if and_after:
+        return before + after[and_after.end():]
+    if and_before:
+        return before[:and_before.start()] + after
+    where = re.search(r"\bWHERE\s*$", before, re.I)
+    if where:
+        return before[:where.start()] + after
+    return None   # Predicate isn't a plain conjunct; leave the query alone
+
+
+def rewrite_contains(query):
+    """
+    (query, params) with name CONTAINS predicates turned into full-text index lookups:
+        CALL db.index.fulltext.queryNodes(...) YIELD node, score
+        WITH node ORDER BY score DESC LIMIT n WITH collect(node) AS candidates_0
+        UNWIND candidates_0 AS e
+        MATCH ... (remaining WHERE) ...
+    Returns (query, None) when the query has no such predicate or can't be rewritten safely.
+    """
+    matches = list(CONTAINS_PREDICATE.finditer(query))
+    if not matches or UNSAFE_CLAUSES.search(query) or not query.lstrip().upper().startswith("MATCH"):
+        return query, None
+    variables = [m.group("var1") or m.group("var2") for m in matches]
+    if len(set(variables)) != len(variables):
+        return query, None   # Two keywords on one variable: one lookup can't express both
+
+    rewritten = query
+    for match in reversed(matches):
+        rewritten = drop_predicate(rewritten, match.span())
+        if rewritten is None:
+            return query, None
+
+    # Each lookup collapses to one row (collect) so the next lookup's LIMIT isn't shared across rows
+    lookups = []
+    params = {}
+    carried = []
+    for n, (match, variable) in enumerate(zip(matches, variables)):
+        keyword = match.group("kw1") if match.group("kw1") is not None else match.group("kw2")
+        term = lucene_query(keyword)
+        if not term:
+            return query, None
+        params[f"fulltext_{n}"] = term
+        lookups.append(
+            f"CALL db.index.fulltext.queryNodes('{FULLTEXT_INDEX}', $fulltext_{n}) YIELD node, score "
+            f"WITH {''.join(c + ', ' for c in carried)}node ORDER BY score DESC LIMIT {CANDIDATE_LIMIT} "
+            f"WITH {''.join(c + ', ' for c in carried)}collect(node) AS candidates_{n}"
+        )
+        carried.append(f"candidates_{n}")
+    unwinds = " ".join(f"UNWIND candidates_{n} AS {variable}" for n, variable in enumerate(variables))
+    return "\n".join(lookups + [unwinds, rewritten.strip()]), params
+
+
+def is_generated_match(query):
+    # Generated answers start with MATCH; schema/apoc introspection (CALL ...) is left as is
+    return query.lstrip().upper().startswith(("MATCH", "OPTIONAL MATCH"))
+
+
+def bound_results(query, limit=RESULT_LIMIT):
+    """Appends LIMIT to a query without one, and lowers a LIMIT above `limit`."""
+    if not RETURN_CLAUSE.search(query):
+        return query
+    stripped = query.rstrip().rstrip(";")
+    match = LIMIT_CLAUSE.search(stripped)
+    if match:
+        if int(match.group(1)) <= limit:
+            return stripped
+        return stripped[:match.start(1)] + str(limit)
+    return f"{stripped}\nLIMIT {limit}"
+
+
+def plan_summary(plan):
+    """Flattens a neo4j plan/profile dict into one row per operator (depth-first)."""
+    rows = []
+
+    def walk(node, depth):
+        args = node.get("args", {})
+        rows.append({
+            "depth": depth,
+            "operator": node.get("operatorType"),
+            "details": args.get("Details"),
+            "estimated_rows": args.get("EstimatedRows"),
+            "rows": node.get("rows"),
+            "db_hits": node.get("dbHits"),
+        })
+        for child in node.get("children", []):
+            walk(child, depth + 1)
+
+    walk(plan, 0)
+    return rows
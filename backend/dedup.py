@@ -0,0 +1,132 @@
+import re
+import zlib
+import hashlib
+import numpy as np
+
+# --- CONFIGURATION ---
+NUM_PERM = 128          # MinHash signature length
+LSH_BANDS = 16          # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always share a bucket
+SHINGLE_SIZE = 5        # Character shingles survive a swapped name far better than word shingles
+DEDUP_THRESHOLD = 0.8   # Estimated Jaccard at which two chunks count as the same text
+# Short or templated texts ("Employee Profile: <name> works as ...") differ in a few characters that
+# are the whole fact; these only merge with an identical text
+MIN_FUZZY_CHARS = 400
+EXACT_ONLY_SOURCES = {"db"}
+
+# Fields copied from a chunk into its entry in "sources"
+REFERENCE_KEYS = ("source", "original_id", "file_name", "table", "page", "start_index", "end_index")
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text):
+    return WHITESPACE.sub(" ", text.lower()).strip()
+
+
+def text_hash(text):
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()[:16]
+
+
+def exact_only(chunk):
+    return chunk.get("source") in EXACT_ONLY_SOURCES or len(chunk["text"]) < MIN_FUZZY_CHARS
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    text = normalize(text)
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """Universal hashing (a*x + b) mod p over crc32 shingle hashes, vectorized with numpy."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+        # uint64 overflow wraps, which is fine for hashing purposes
+        permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + banded LSH over the chunks kept so far. Each incoming chunk is either
+    new (returns its own slot) or folded into the representative it duplicates.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=LSH_BANDS, threshold=DEDUP_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.buckets = [dict() for _ in range(bands)]
+        self.signatures = []
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, text):
+        """Returns (slot, is_duplicate): the representative's slot for duplicates, a new slot otherwise."""
+        signature = self.hasher.signature(text)
+        keys = self._band_keys(signature)
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(self.buckets[band].get(key, ()))
+
+        best_slot, best_score = None, 0.0
+        for slot in candidates:
+            score = float(np.mean(self.signatures[slot] == signature))
+            if score > best_score:
+                best_slot, best_score = slot, score
+        if best_slot is not None and best_score >= self.threshold:
+            return best_slot, True
+
+        slot = len(self.signatures)
+        self.signatures.append(signature)
+        for band, key in enumerate(keys):
+            self.buckets[band].setdefault(key, []).append(slot)
+        return slot, False
+
+
+def dedup_chunks(chunks):
+    """
+    chunks: [{"text", "source", "original_id", ...}]. Returns the kept chunks, each with a
+    "sources" list covering every chunk folded into it, plus the number of duplicates dropped.
+    Database rows and short chunks are only merged with an identical text, never a near one.
+    """
+    index = NearDuplicateIndex()
+    exact = {}        # text hash -> position in `kept`, for chunks kept out of near-duplicate matching
+    near_slots = []   # LSH slot -> position in `kept` (the index holds only the fuzzy-matched chunks)
+    kept = []
+    dropped = 0
+    for chunk in chunks:
+        digest = text_hash(chunk["text"])
+        if exact_only(chunk):
+            slot = exact.get(digest)
+            duplicate = slot is not None
+            if not duplicate:
+                slot = exact[digest] = len(kept)
+        else:
+            slot, duplicate = index.add(chunk["text"])
+            if duplicate:
+                slot = near_slots[slot]
+            else:
+                near_slots.append(len(kept))
+        # The text hash tells apart references that share every other field (DB rows: source/id/file)
+        reference = dict({key: chunk[key] for key in REFERENCE_KEYS if key in chunk}, text_hash=digest)
+        if duplicate:
+            if reference not in kept[slot]["sources"]:
+                kept[slot]["sources"].append(reference)
+            dropped += 1
+        else:
+            kept.append(dict(chunk, sources=[reference]))
+    return kept, dropped
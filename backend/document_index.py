@@ -0,0 +1,135 @@
+import os
+import json
+import numpy as np
+import faiss
+from vector_store import EMPTY_DISTANCE, search
+
+# --- CONFIGURATION ---
+DOCUMENT_INDEX_FILE = "document_index.faiss"   # One pooled embedding per source file / table
+DOCUMENT_MAP_FILE = "document_map.json"        # Document -> its chunk rows in the chunk index
+TOP_DOCUMENTS = int(os.getenv("TOP_DOCUMENTS", "8"))                        # Documents whose chunks are searched
+MAX_CHUNKS_PER_DOCUMENT = int(os.getenv("MAX_CHUNKS_PER_DOCUMENT", "2"))    # Per answer, while others are left
+CHUNK_OVERSAMPLE = 4   # Chunks fetched per requested one, so the per-document cap can still fill k
+BATCH_OVERSAMPLE = 4   # Extra depth of the one shared search a batch makes over all its candidate chunks
+
+
+def document_key(record):
+    # Every database row has source "db"; each table is its own document
+    if record.get("table"):
+        return f"db:{record['table']}"
+    return record.get("file_name") or os.path.basename(record.get("source", "unknown"))
+
+
+def pooled_embeddings(embeddings, metadata):
+    """(document keys, unit-length mean embedding of each document's chunks, chunk rows per document)."""
+    rows_by_document = {}
+    for row, record in enumerate(metadata):
+        rows_by_document.setdefault(document_key(record), []).append(row)
+    keys = sorted(rows_by_document)
+    pooled = np.stack([embeddings[rows_by_document[key]].mean(axis=0) for key in keys]).astype("float32")
+    # Chunk vectors are unit length; keep the pooled ones comparable under L2
+    pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+    return keys, pooled, [rows_by_document[key] for key in keys]
+
+
+def write_document_index(embeddings, metadata, build_dir):
+    embeddings = np.asarray(embeddings, dtype="float32")
+    keys, pooled, rows = pooled_embeddings(embeddings, metadata)
+    index = faiss.IndexFlatL2(pooled.shape[1])
+    index.add(pooled)
+    faiss.write_index(index, os.path.join(build_dir, DOCUMENT_INDEX_FILE))
+    with open(os.path.join(build_dir, DOCUMENT_MAP_FILE), "w", encoding="utf-8") as f:
+        json.dump({"documents": [{"key": key, "rows": r} for key, r in zip(keys, rows)]}, f)
+    return len(keys)
+
+
+class DocumentIndex:
+    """
+    First stage of two-stage retrieval: the nearest documents by pooled embedding. Their chunk
+    rows then restrict the chunk search (faiss ID selector), so only those chunks are scored and
+    a large PDF can't fill every slot of the answer.
+    """
+
+    def __init__(self, index, documents, chunk_count):
+        self.index = index
+        self.keys = [d["key"] for d in documents]
+        self.rows = [np.asarray(d["rows"], dtype=np.int64) for d in documents]
+        self.document_of_row = np.full(chunk_count, -1, dtype=np.int32)
+        for document, rows in enumerate(self.rows):
+            self.document_of_row[rows] = document
+
+    @classmethod
+    def load(cls, base, chunk_count):
+        index_path = os.path.join(base, DOCUMENT_INDEX_FILE)
+        if not os.path.exists(index_path):
+            return None
+        with open(os.path.join(base, DOCUMENT_MAP_FILE), "r", encoding="utf-8") as f:
+            documents = json.load(f)["documents"]
+        return cls(faiss.read_index(index_path), documents, chunk_count)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def candidate_rows(self, query_vectors, top=TOP_DOCUMENTS, restrict=None):
+        """Chunk rows of the `top` nearest documents, per query row (within `restrict` if given)."""
+        allowed = None
+        if restrict is not None:
+            restrict = np.asarray(restrict, dtype=np.int64)
+            allowed = np.unique(self.document_of_row[restrict])
+            allowed = allowed[allowed >= 0]
+        _, documents = search(self.index, query_vectors, min(top, len(self)), allowed)
+        candidates = []
+        for found in documents:
+            found = found[found != -1]
+            rows = np.concatenate([self.rows[d] for d in found]) if len(found) else np.empty(0, dtype=np.int64)
+            candidates.append(np.intersect1d(rows, restrict) if restrict is not None else rows)
+        return candidates
+
+    def search_candidates(self, search_chunks, query_vectors, candidates, k, fallback_ids=None):
+        """
+        Second stage for every query row: (distances, indices) of the best k chunks among its own
+        candidate rows. A batch makes one matrix search over the union of all candidate rows and
+        filters each row's results to its own; a row whose filtered list comes up short (its chunks
+        were outranked by other rows' documents) is searched again alone, so results equal per-row searches.
+        search_chunks(vectors, k, ids) is the chunk index search.
+        """
+        want = k * CHUNK_OVERSAMPLE
+        found = [None] * len(candidates)
+        shared = [row for row, rows in enumerate(candidates) if len(rows) >= k]
+        if len(shared) > 1:
+            union = np.unique(np.concatenate([candidates[row] for row in shared]))
+            distances, indices = search_chunks(np.asarray(query_vectors)[shared], want * BATCH_OVERSAMPLE, union)
+            for n, row in enumerate(shared):
+                keep = np.isin(indices[n], candidates[row])
+                # Enough of its own rows, or the union was exhausted (so nothing of its own was cut off)
+                if keep.sum() >= want or (indices[n] == -1).any():
+                    found[row] = (distances[n][keep][:want], indices[n][keep][:want])
+        out_distances = np.full((len(candidates), k), EMPTY_DISTANCE, dtype="float32")
+        out_indices = np.full((len(candidates), k), -1, dtype=np.int64)
+        for row, rows in enumerate(candidates):
+            if found[row] is None:
+                # Too few chunks in the chosen documents to fill k: search everything allowed instead
+                distances, indices = search_chunks(np.asarray(query_vectors)[row:row + 1], want,
+                                                   rows if len(rows) >= k else fallback_ids)
+                found[row] = (distances[0], indices[0])
+            out_distances[row], out_indices[row] = self.diversify(*found[row], k)
+        return out_distances, out_indices
+
+    def diversify(self, distances, indices, k, per_document=MAX_CHUNKS_PER_DOCUMENT):
+        """Best k chunks with at most `per_document` from one document, topped up if that leaves gaps."""
+        picked, held_back, used = [], [], {}
+        for distance, row in zip(distances, indices):
+            if row == -1:
+                continue
+            document = self.document_of_row[row]
+            if used.get(document, 0) < per_document:
+                used[document] = used.get(document, 0) + 1
+                picked.append((distance, row))
+            else:
+                held_back.append((distance, row))
+        chosen = (picked + held_back)[:k]
+        out_distances = np.full(k, EMPTY_DISTANCE, dtype="float32")
+        out_indices = np.full(k, -1, dtype=np.int64)
+        for rank, (distance, row) in enumerate(sorted(chosen)):
+            out_distances[rank], out_indices[rank] = distance, row
+        return out_distances, out_indices
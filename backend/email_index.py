@@ -0,0 +1,214 @@
+import os
+import re
+import json
+import bisect
+import calendar
+from datetime import datetime, timedelta
+
+# --- CONFIGURATION ---
+EMAIL_INDEX_FILE = "email_index.json"   # Written by milestone3_embedding_pipeline.py
+# "Last week" is relative to this date; set it to replay questions against an old mailbox
+EMAIL_REFERENCE_DATE = os.getenv("EMAIL_REFERENCE_DATE", "")
+MIN_NAME_TOKEN = 3
+
+EMAIL_INTENT = re.compile(r"\b(e-?mails?|e-?mailed|mails?|wrote|sen[dt]|messages?|threads?|inbox|cc'?d)\b", re.I)
+THREAD_INTENT = re.compile(r"\b(threads?|conversations?|repl(y|ies|ied)|back and forth)\b", re.I)
+TOKEN = re.compile(r"[a-z][a-z'\-]+")
+MONTHS = {name.lower(): n for n, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): n for n, name in enumerate(calendar.month_abbr) if name})
+MONTH_PATTERN = re.compile(r"\b(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\b\.?(?:\s+(\d{4}))?", re.I)
+LAST_DAYS = re.compile(r"\b(?:last|past)\s+(\d+)\s+days?\b", re.I)
+
+
+def build_email_index(metadata, headers):
+    """
+    metadata: the faiss_metadata.json rows (deduplicated chunks list every file in "sources").
+    headers: file_name -> parsed header dict from data_ingestion/email_ingestion.py.
+    Index lists hold file names; each message lists the FAISS rows that carry its text.
+    """
+    messages = {}
+    for row, record in enumerate(metadata):
+        for ref in record.get("sources") or [record]:
+            name = ref.get("file_name")
+            if name in headers:
+                entry = messages.setdefault(name, dict(headers[name], rows=[]))
+                if row not in entry["rows"]:
+                    entry["rows"].append(row)
+
+    senders, recipients, threads = {}, {}, {}
+    for name, message in messages.items():
+        if message.get("from"):
+            senders.setdefault(message["from"], []).append(name)
+        for address in message.get("to", []):
+            recipients.setdefault(address, []).append(name)
+        thread = threads.setdefault(message["thread_id"], {"subject": message.get("subject", ""), "messages": []})
+        thread["messages"].append(name)
+    dates = sorted([message["date"], name] for name, message in messages.items() if message.get("date"))
+    for thread in threads.values():
+        thread["messages"].sort(key=lambda name: messages[name].get("date") or "")
+    return {"messages": messages, "senders": senders, "recipients": recipients, "threads": threads, "dates": dates}
+
+
+class EmailIndex:
+    """
+    Header indexes over the ingested emails (sender, recipient, date, thread).
+    candidates() turns the person/time/thread part of an email question into the FAISS rows
+    worth searching, so the vector search only ranks those instead of the whole corpus.
+    """
+
+    def __init__(self, data):
+        self.messages = data["messages"]
+        self.senders = data["senders"]
+        self.recipients = data["recipients"]
+        self.threads = data["threads"]
+        self.date_keys = [d for d, _ in data["dates"]]
+        self.date_names = [name for _, name in data["dates"]]
+        # "asha" / "chopra" / "asha chopra" -> addresses, from the local part of every address
+        self.names = {}
+        for address in set(self.senders) | set(self.recipients):
+            parts = [p for p in re.split(r"[._\-]", address.split("@")[0]) if p]
+            for key in parts + [" ".join(parts)]:
+                if len(key) >= MIN_NAME_TOKEN:
+                    self.names.setdefault(key, set()).add(address)
+        self.subjects = {}   # lowercase subject -> messages (one subject can span several threads)
+        for name, message in self.messages.items():
+            if message.get("subject"):
+                self.subjects.setdefault(message["subject"].lower(), []).append(name)
+
+    @classmethod
+    def load(cls, path=EMAIL_INDEX_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def stats(self):
+        return {"messages": len(self.messages), "senders": len(self.senders), "threads": len(self.threads)}
+
+    def reference_date(self):
+        if EMAIL_REFERENCE_DATE:
+            return datetime.fromisoformat(EMAIL_REFERENCE_DATE)
+        return datetime.now()
+
+    def people(self, query):
+        """(address, role) pairs; role is "from", "to" or None when the question doesn't say."""
+        # "samir.iyer" in a question reads like "samir iyer"
+        lowered = re.sub(r"(?<=[a-z])[._](?=[a-z])", " ", query.lower())
+        tokens = TOKEN.findall(lowered)
+        found = []
+        # Full names first ("asha chopra"), then single first/last names not already covered
+        for first, last in zip(tokens, tokens[1:]):
+            for address in self.names.get(f"{first} {last}", ()):
+                found.append((address, f"{first} {last}"))
+        covered = {word for _, name in found for word in name.split()}
+        for token in tokens:
+            if token not in covered:
+                found.extend((address, token) for address in self.names.get(token, ()))
+
+        people = []
+        for address, name in found:
+            role = None
+            if re.search(r"\b(to|for|cc'?d?)\s+" + re.escape(name), lowered) or \
+                    re.search(r"\b(e-?mailed|wrote to|sen[dt] to)\s+" + re.escape(name), lowered):
+                role = "to"
+            elif re.search(r"\b(from|by)\s+" + re.escape(name), lowered) or \
+                    re.search(re.escape(name) + r"\s+(e-?mailed|wrote|sen[dt])", lowered):
+                role = "from"
+            people.append((address, role))
+        return people
+
+    def period(self, query):
+        """(start, end) datetimes for relative or month expressions, or None."""
+        now = self.reference_date()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        lowered = query.lower()
+        if "yesterday" in lowered:
+            return today - timedelta(days=1), today
+        if "today" in lowered:
+            return today, today + timedelta(days=1)
+        if "this week" in lowered:
+            return today - timedelta(days=today.weekday()), today + timedelta(days=1)
+        if "last week" in lowered:
+            start = today - timedelta(days=today.weekday() + 7)
+            return start, start + timedelta(days=7)
+        if "this month" in lowered:
+            return today.replace(day=1), today + timedelta(days=1)
+        if "last month" in lowered:
+            end = today.replace(day=1)
+            return (end - timedelta(days=1)).replace(day=1), end
+        match = LAST_DAYS.search(query)
+        if match:
+            return today - timedelta(days=int(match.group(1))), today + timedelta(days=1)
+        match = MONTH_PATTERN.search(query)
+        if match and (match.group(2) or re.search(r"\b(in|during|since)\s+" + match.group(1).lower(), lowered)):
+            month = MONTHS[match.group(1).lower()]
+            # Without a year, the most recent such month
+            year = int(match.group(2)) if match.group(2) else now.year - (month > now.month)
+            start = datetime(year, month, 1)
+            return start, datetime(year + month // 12, month % 12 + 1, 1)
+        return None
+
+    def subject(self, query):
+        lowered = query.lower()
+        return next((s for s in sorted(self.subjects, key=len, reverse=True) if s in lowered), None)
+
+    def whole_threads(self, names):
+        return {member for name in names for member in self.threads[self.messages[name]["thread_id"]]["messages"]}
+
+    def in_period(self, start, end):
+        lo = bisect.bisect_left(self.date_keys, start.isoformat())
+        hi = bisect.bisect_left(self.date_keys, end.isoformat())
+        return set(self.date_names[lo:hi])
+
+    def candidates(self, query):
+        """
+        (rows, filters) for an email question scoped by person, time or thread; (None, {}) when the
+        question isn't one, or names nothing the index knows. rows may be empty: nothing matches.
+        """
+        if not EMAIL_INTENT.search(query):
+            return None, {}
+        filters = {}
+        selected = None
+
+        people = self.people(query)
+        if people:
+            # Same role: any of them ("Asha" -> every Asha); different roles: all of them (from Samir to Rita)
+            by_role = {}
+            for address, role in people:
+                matched = by_role.setdefault(role, set())
+                if role in ("from", None):
+                    matched.update(self.senders.get(address, ()))
+                if role in ("to", None):
+                    matched.update(self.recipients.get(address, ()))
+            filters["people"] = sorted({f"{role or 'any'}:{address}" for address, role in people})
+            selected = set.intersection(*by_role.values())
+
+        period = self.period(query)
+        if period:
+            filters["period"] = [period[0].date().isoformat(), period[1].date().isoformat()]
+            in_period = self.in_period(*period)
+            selected = in_period if selected is None else selected & in_period
+
+        subject = self.subject(query)
+        if subject:
+            filters["subject"] = subject
+            with_subject = set(self.subjects[subject])
+            selected = with_subject if selected is None else selected & with_subject
+
+        if selected is None:
+            return None, {}
+        if THREAD_INTENT.search(query):
+            # "the thread/conversation where ...": every message of the threads that matched
+            selected = self.whole_threads(selected)
+            filters["threads"] = len({self.messages[name]["thread_id"] for name in selected})
+        rows = sorted({row for name in selected for row in self.messages[name]["rows"]})
+        filters["messages"] = len(selected)
+        return rows, filters
+
+
+# Quick Test
+if __name__ == "__main__":
+    import sys
+    index = EmailIndex.load()
+    print(index.stats())
+    for question in sys.argv[1:] or ["What did Asha email about SecureID?", "Emails from samir.iyer in September 2025"]:
+        rows, filters = index.candidates(question)
+        print(question, "->", filters, f"{len(rows)} rows" if rows is not None else "no narrowing")
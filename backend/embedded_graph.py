@@ -0,0 +1,201 @@
+import re
+import json
+import time
+import bisect
+import numpy as np
+
+# --- CONFIGURATION ---
+TRIPLES_FILE = "output_3_triples.json"   # Written by data_ingestion/run_milestone2.py
+MAX_HOPS = 2
+MAX_SEEDS = 5          # Entities matched from one question
+MAX_FACTS = 40         # Facts returned to the answer prompt
+MIN_FUZZY_TOKEN = 4    # Shorter words are too ambiguous for substring matching
+
+STOPWORDS = {
+    "who", "what", "which", "where", "when", "why", "how", "does", "did", "the", "and", "for", "with",
+    "about", "from", "into", "that", "this", "there", "their", "is", "are", "was", "were", "of", "in",
+    "on", "to", "a", "an", "by", "it", "its", "be", "as", "at", "or", "do", "list", "show", "tell", "me",
+    "work", "works", "company", "summarize", "describe",
+}
+TOKEN = re.compile(r"[\w&.\-']+")
+
+
+class EmbeddedGraph:
+    """
+    Read-only, in-process graph built from (head, relation, tail) triples.
+    Entities are interned to int ids; adjacency is stored as CSR numpy arrays
+    (both directions, since the Cypher prompt treats relationships as undirected),
+    with a lowercase name index for exact, prefix and substring lookup.
+    """
+
+    def __init__(self, triples):
+        start = time.perf_counter()
+        self.names = []
+        self.relations = []
+        name_ids = {}
+        relation_ids = {}
+
+        def intern(table, values, value):
+            if value not in table:
+                table[value] = len(values)
+                values.append(value)
+            return table[value]
+
+        edges = set()
+        for head, relation, tail in triples:
+            h = intern(name_ids, self.names, str(head))
+            t = intern(name_ids, self.names, str(tail))
+            r = intern(relation_ids, self.relations, str(relation))
+            edges.add((h, r, t))
+
+        edges = np.array(sorted(edges), dtype=np.int64).reshape(-1, 3)
+        self.edge_count = len(edges)
+        self._build_csr(edges)
+        self._build_name_index()
+        self.load_seconds = time.perf_counter() - start
+
+    @classmethod
+    def from_triples_file(cls, path=TRIPLES_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            exported = json.load(f)
+        # run_milestone2 exports [{"doc_id": i, "triples": [[h, r, t], ...]}, ...]
+        triples = (t for doc in exported for t in doc.get("triples", []))
+        return cls(triples)
+
+    def _build_csr(self, edges):
+        n = len(self.names)
+        heads, rels, tails = edges[:, 0], edges[:, 1], edges[:, 2]
+        # Each edge appears in both endpoints' rows; `outgoing` remembers the original direction
+        src = np.concatenate([heads, tails])
+        dst = np.concatenate([tails, heads])
+        rel = np.concatenate([rels, rels])
+        outgoing = np.concatenate([np.ones(len(heads), bool), np.zeros(len(heads), bool)])
+
+        order = np.argsort(src, kind="stable")
+        self.neighbors = dst[order].astype(np.int32)
+        self.edge_relation = rel[order].astype(np.int32)
+        self.edge_outgoing = outgoing[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+
+    def _build_name_index(self):
+        lowered = [name.lower() for name in self.names]
+        self.exact = {}
+        for entity_id, name in enumerate(lowered):
+            self.exact.setdefault(name, []).append(entity_id)
+        # Sorted (name, id) pairs for prefix search with bisect
+        pairs = sorted(zip(lowered, range(len(lowered))))
+        self.sorted_names = [p[0] for p in pairs]
+        self.sorted_ids = [p[1] for p in pairs]
+        # One NUL-separated string for substring search; `starts` maps offsets back to ids
+        self.blob = "\x00" + "\x00".join(lowered) + "\x00"
+        self.starts = []
+        offset = 1
+        for name in lowered:
+            self.starts.append(offset)
+            offset += len(name) + 1
+
+    # --- NAME LOOKUP ---
+    def find_prefix(self, prefix, limit=20):
+        prefix = prefix.lower()
+        i = bisect.bisect_left(self.sorted_names, prefix)
+        found = []
+        while i < len(self.sorted_names) and self.sorted_names[i].startswith(prefix) and len(found) < limit:
+            found.append(self.sorted_ids[i])
+            i += 1
+        return found
+
+    def find_substring(self, text, limit=20):
+        text = text.lower()
+        found = []
+        pos = self.blob.find(text)
+        while pos != -1 and len(found) < limit:
+            entity_id = bisect.bisect_right(self.starts, pos) - 1
+            if entity_id >= 0 and (not found or found[-1] != entity_id):
+                found.append(entity_id)
+            # Skip to the next name so one entity is reported once
+            next_start = self.starts[entity_id + 1] if entity_id + 1 < len(self.starts) else len(self.blob)
+            pos = self.blob.find(text, max(pos + 1, next_start))
+        return found
+
+    def match_entities(self, query):
+        """Entity ids mentioned in a question: longest exact n-gram matches first, then substrings."""
+        tokens = [t.strip(".'-").lower() for t in TOKEN.findall(query)]
+        tokens = [t for t in tokens if t]
+        seeds = []
+        used = set()
+        for size in (4, 3, 2, 1):
+            for i in range(len(tokens) - size + 1):
+                if any(j in used for j in range(i, i + size)):
+                    continue
+                phrase = " ".join(tokens[i:i + size])
+                if size == 1 and phrase in STOPWORDS:
+                    continue
+                ids = self.exact.get(phrase)
+                if ids:
+                    seeds.extend(ids)
+                    used.update(range(i, i + size))
+        if not seeds:
+            for token in tokens:
+                if len(token) >= MIN_FUZZY_TOKEN and token not in STOPWORDS:
+                    seeds.extend(self.find_substring(token, limit=MAX_SEEDS))
+        return list(dict.fromkeys(seeds))[:MAX_SEEDS]
+
+    # --- TRAVERSAL ---
+    def neighbourhood(self, seeds, hops=MAX_HOPS, max_facts=MAX_FACTS):
+        """Breadth-first k-hop expansion; returns (head, relation, tail) facts in discovery order."""
+        visited = np.zeros(len(self.names), dtype=bool)
+        frontier = np.array(seeds, dtype=np.int64)
+        visited[frontier] = True
+        facts = []
+        for _ in range(hops):
+            if len(frontier) == 0 or len(facts) >= max_facts:
+                break
+            next_frontier = []
+            for node in frontier:
+                lo, hi = self.indptr[node], self.indptr[node + 1]
+                for other, rel, outgoing in zip(self.neighbors[lo:hi], self.edge_relation[lo:hi],
+                                                self.edge_outgoing[lo:hi]):
+                    head, tail = (node, other) if outgoing else (other, node)
+                    facts.append((self.names[head], self.relations[rel], self.names[tail]))
+                    if not visited[other]:
+                        visited[other] = True
+                        next_frontier.append(other)
+                    if len(facts) >= max_facts:
+                        break
+                if len(facts) >= max_facts:
+                    break
+            frontier = np.array(next_frontier, dtype=np.int64)
+        return list(dict.fromkeys(facts))
+
+    def get_context(self, query):
+        # Same interface as the Neo4j path in HybridRAG.get_graph_context
+        seeds = self.match_entities(query)
+        if not seeds:
+            return "No direct connections found in Knowledge Graph."
+        facts = self.neighbourhood(seeds)
+        if not facts:
+            return "No direct connections found in Knowledge Graph."
+        return "Direct Relationships: " + "; ".join(f"{h} {r} {t}" for h, r, t in facts)
+
+    def stats(self):
+        return {
+            "entities": len(self.names),
+            "relations": len(self.relations),
+            "edges": self.edge_count,
+            "load_seconds": round(self.load_seconds, 3),
+            "csr_bytes": int(self.indptr.nbytes + self.neighbors.nbytes + self.edge_relation.nbytes
+                             + self.edge_outgoing.nbytes),
+        }
+
+
+if __name__ == "__main__":
+    graph = EmbeddedGraph.from_triples_file()
+    print(json.dumps(graph.stats(), indent=4))
+    while True:
+        q = input("\nQuestion (or 'exit'): ")
+        if q.lower() == "exit":
+            break
+        start = time.perf_counter()
+        context = graph.get_context(q)
+        print(f"{context}\n⏱️ {(time.perf_counter() - start) * 1e6:.0f} µs")
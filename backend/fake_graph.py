@@ -0,0 +1,15 @@
+import time
+
+# --- CONFIGURATION ---
+FAKE_GRAPH_CONTEXT = "Direct Relationships: NovaPay, Insight360, SecureID, Arjun Mehta, Infosys"
+
+
+class FakeGraph:
+    """Stand-in for the Neo4j + Cypher path (GRAPH_BACKEND=fake) with a fixed, configurable latency."""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+
+    def get_context(self, query):
+        time.sleep(self.latency)
+        return FAKE_GRAPH_CONTEXT
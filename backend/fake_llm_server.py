@@ -0,0 +1,123 @@
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURATION ---
+# A local stand-in for the Groq OpenAI-compatible API, for testing the LLM gateway
+# without network access or API quota. Start it, then run the backend with:
+#   GROQ_API_BASE=http://127.0.0.1:9100 GROQ_API_KEY=fake uvicorn main:app
+HOST = "127.0.0.1"
+PORT = 9100
+FAKE_CYPHER = "MATCH (e:Entity)-[r]-(e2:Entity) RETURN DISTINCT e2.name LIMIT 5"
+FAKE_ANSWER = "This is a canned answer from the fake LLM server."
+
+
+class FakeLLMState:
+    def __init__(self, latency=0.2, error_rate=0.0, rate_limit_every=0, tokens_per_second=0, completion_tokens=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    state = FakeLLMState()
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet under load
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, {"requests": self.state.requests})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.state.lock:
+            self.state.requests += 1
+            count = self.state.requests
+
+        # Failure injection: every Nth call is rate limited, plus random 500s
+        if self.state.rate_limit_every and count % self.state.rate_limit_every == 0:
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                            headers={"Retry-After": "1"})
+            return
+        if random.random() < self.state.error_rate:
+            self._send_json(500, {"error": {"message": "Injected failure"}})
+            return
+
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        content = FAKE_CYPHER if "Generate Cypher" in prompt else FAKE_ANSWER
+        if self.state.completion_tokens and content == FAKE_ANSWER:
+            # Pad answers to a realistic length so generation time scales like a real model
+            words = FAKE_ANSWER.split()
+            content = " ".join(words[i % len(words)] for i in range(self.state.completion_tokens))
+
+        # Time to first token + decode time at the configured token rate
+        delay = self.state.latency
+        if self.state.tokens_per_second:
+            delay += len(content.split()) / self.state.tokens_per_second
+        time.sleep(delay)
+
+        prompt_tokens = len(prompt.split())
+        completion_tokens = len(content.split())
+        self._send_json(200, {
+            "id": f"chatcmpl-fake-{count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+
+def run_server(host=HOST, port=PORT, latency=0.2, error_rate=0.0, rate_limit_every=0,
+               tokens_per_second=0, completion_tokens=0):
+    FakeLLMHandler.state = FakeLLMState(latency, error_rate, rate_limit_every, tokens_per_second, completion_tokens)
+    server = ThreadingHTTPServer((host, port), FakeLLMHandler)
+    print(f"🧪 Fake LLM listening on http://{host}:{port} (latency={latency}s, {tokens_per_second or 'inf'} tok/s)")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Groq-compatible LLM server")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls that return 500")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Return 429 on every Nth call")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="Decode speed (0 = instant)")
+    parser.add_argument("--completion-tokens", type=int, default=0, help="Answer length in tokens (0 = short canned answer)")
+    args = parser.parse_args()
+
+    run_server(HOST, args.port, args.latency, args.error_rate, args.rate_limit_every,
+               args.tokens_per_second, args.completion_tokens).serve_forever()
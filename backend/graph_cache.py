@@ -0,0 +1,92 @@
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# --- CONFIGURATION ---
+GRAPH_CACHE_MAX_ENTRIES = 2000
+GRAPH_CACHE_MAX_BYTES = 32 * 1024 * 1024   # Approximate, measured on the JSON form of each result
+VERSION_CHECK_INTERVAL = 5.0               # Seconds between graph version stamp reads
+
+# Must match data_ingestion/graph_loader.py, which bumps it after every write
+GRAPH_VERSION_QUERY = "MATCH (m:GraphMeta {id: 'graph'}) RETURN m.version AS version"
+
+WRITE_CLAUSE = re.compile(r"\b(CREATE|MERGE|SET|DELETE|DETACH|REMOVE|DROP|LOAD\s+CSV)\b", re.I)
+
+
+def normalize_cypher(query):
+    # Whitespace and a trailing semicolon don't change meaning; string literals stay case-sensitive
+    return " ".join(query.split()).rstrip(";").strip()
+
+
+def is_read_only(query):
+    return not WRITE_CLAUSE.search(query)
+
+
+class GraphCache:
+    """
+    LRU cache of Cypher results keyed by normalized query text + parameters,
+    bounded by entry count and size, and dropped wholesale when the graph version changes.
+    """
+
+    def __init__(self, max_entries=GRAPH_CACHE_MAX_ENTRIES, max_bytes=GRAPH_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()   # key -> (result, size, neo4j_seconds)
+        self.total_bytes = 0
+        self.version = None
+        self.last_version_check = 0.0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "neo4j_seconds_saved": 0.0}
+
+    @staticmethod
+    def make_key(query, params):
+        return normalize_cypher(query) + "\x00" + json.dumps(params or {}, sort_keys=True, default=str)
+
+    def version_check_due(self):
+        return time.monotonic() - self.last_version_check >= VERSION_CHECK_INTERVAL
+
+    def set_version(self, version):
+        with self.lock:
+            self.last_version_check = time.monotonic()
+            if version != self.version:
+                if self.entries:
+                    self.stats["invalidations"] += 1
+                self.entries.clear()
+                self.total_bytes = 0
+                self.version = version
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            self.stats["neo4j_seconds_saved"] += entry[2]
+            return entry
+
+    def put(self, key, result, neo4j_seconds):
+        size = len(json.dumps(result, default=str))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.total_bytes -= old[1]
+            self.entries[key] = (result, size, neo4j_seconds)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted[1]
+
+    def summary(self):
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(self.stats,
+                        entries=len(self.entries),
+                        bytes=self.total_bytes,
+                        graph_version=self.version,
+                        hit_ratio=round(self.stats["hits"] / lookups, 3) if lookups else 0.0)
@@ -0,0 +1,117 @@
+import os
+import copy
+import json
+import time
+import threading
+from langchain_neo4j import Neo4jGraph
+from graph_cache import GraphCache, GRAPH_VERSION_QUERY, is_read_only
+from cypher_guard import ENSURE_FULLTEXT_INDEX, bound_results, is_generated_match, plan_summary, rewrite_contains
+import telemetry
+
+# --- CONFIGURATION ---
+GRAPH_QUERY_TIMEOUT = float(os.getenv("GRAPH_QUERY_TIMEOUT", "5"))          # Server-side transaction timeout (s)
+CYPHER_FULLTEXT = os.getenv("CYPHER_FULLTEXT", "1") != "0"                  # Rewrite name CONTAINS to index lookups
+CYPHER_SCAN_FALLBACK = os.getenv("CYPHER_SCAN_FALLBACK", "1") != "0"        # Retry the original query on an index miss
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.5"))
+SLOW_QUERY_PLAN = os.getenv("SLOW_QUERY_PLAN", "EXPLAIN")   # EXPLAIN (plan only) or PROFILE (re-runs the query)
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "slow_cypher.jsonl")
+
+
+class GraphStore(Neo4jGraph):
+    """
+    Neo4jGraph used by the Cypher QA chain. Every Bolt round trip is timed as its own
+    stage, and read-only results are served from a GraphCache while the graph version
+    stamp written by graph_loader stays the same. Generated queries are bounded: name
+    CONTAINS filters go through the Entity.name full-text index, results get a LIMIT,
+    transactions a timeout, and slow queries have their plan logged.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.cache = GraphCache()
+        self.log_lock = threading.Lock()
+        self.fulltext = False   # Decided once the connection (and schema refresh) is up
+        kwargs.setdefault("timeout", GRAPH_QUERY_TIMEOUT)
+        super().__init__(*args, **kwargs)
+        self.fulltext = CYPHER_FULLTEXT and self.ensure_fulltext_index()
+
+    def ensure_fulltext_index(self):
+        try:
+            super().query(ENSURE_FULLTEXT_INDEX)
+            return True
+        except Exception as e:
+            print(f"⚠️ Full-text index on Entity.name unavailable, using CONTAINS scans: {e}")
+            return False
+
+    def _refresh_version(self):
+        try:
+            rows = super().query(GRAPH_VERSION_QUERY)
+            self.cache.set_version(rows[0]["version"] if rows else None)
+        except Exception as e:
+            # Can't tell whether the graph changed: start over rather than serve stale rows
+            print(f"⚠️ Graph version check failed: {e}")
+            self.cache.set_version(object())
+
+    def query(self, query, params=None, *args, **kwargs):
+        params = params or {}
+        if not is_read_only(query):
+            with telemetry.span("neo4j_query"):
+                return super().query(query, params, *args, **kwargs)
+
+        original = query
+        fulltext_params = None
+        if is_generated_match(query):
+            if self.fulltext:
+                query, fulltext_params = rewrite_contains(query)
+            query = bound_results(query)
+            original = bound_results(original)
+            params = dict(params, **(fulltext_params or {}))
+
+        if self.cache.version_check_due():
+            self._refresh_version()
+
+        key = GraphCache.make_key(query, params)
+        entry = self.cache.get(key)
+        telemetry.record_cache("graph_query", hit=entry is not None)
+        if entry is not None:
+            telemetry.record_cache_saving("graph_query", entry[2])
+            # Callers may mutate the rows they get back
+            return copy.deepcopy(entry[0])
+
+        start = time.perf_counter()
+        result = self._timed_query(query, params, *args, **kwargs)
+        if fulltext_params is not None:
+            telemetry.record_cypher_rewrite("index_hit" if result else "index_miss")
+            if not result and CYPHER_SCAN_FALLBACK:
+                # Prefix terms can't express a substring in the middle of a name ("tech" in "NovaTech")
+                result = self._timed_query(original, {k: v for k, v in params.items() if k not in fulltext_params},
+                                           *args, **kwargs)
+        self.cache.put(key, result, time.perf_counter() - start)
+        return copy.deepcopy(result)
+
+    def _timed_query(self, query, params, *args, **kwargs):
+        start = time.perf_counter()
+        with telemetry.span("neo4j_query"):
+            result = super().query(query, params, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+        if elapsed >= SLOW_QUERY_SECONDS and SLOW_QUERY_LOG:
+            # The plan is fetched off the request path
+            threading.Thread(target=self.log_slow_query, args=(query, params, elapsed), daemon=True).start()
+        return result
+
+    def log_slow_query(self, query, params, elapsed):
+        entry = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "ms": round(elapsed * 1000, 1), "query": query,
+                 "params": params, "mode": SLOW_QUERY_PLAN}
+        try:
+            with self._driver.session(database=self._database) as session:
+                summary = session.run(f"{SLOW_QUERY_PLAN} {query}", params).consume()
+            plan = summary.profile if SLOW_QUERY_PLAN.upper() == "PROFILE" else summary.plan
+            entry["plan"] = plan_summary(plan) if plan else None
+            # Label or all-node scans are what the full-text rewrite exists to avoid
+            entry["scans"] = [row["operator"] for row in entry["plan"] or []
+                              if row["operator"] and row["operator"].startswith(("NodeByLabelScan", "AllNodesScan"))]
+        except Exception as e:
+            entry["plan_error"] = str(e)
+        print(f"🐢 Slow Cypher ({entry['ms']} ms): {' '.join(query.split())[:120]}")
+        with self.log_lock:
+            with open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+
+# --- CONFIGURATION ---
+INDEX_ROOT = os.getenv("INDEX_ROOT", "indexes")   # One sub-directory per embedding pipeline build
+CURRENT_FILE = "CURRENT"                          # {"version", "previous"}; replaced atomically on publish
+MANIFEST_FILE = "manifest.json"
+INDEX_KEEP = int(os.getenv("INDEX_KEEP", "3"))    # Builds kept on disk (the published and previous one always are)
+
+
+class IndexVersionError(Exception):
+    pass
+
+
+def new_version_dir(root=INDEX_ROOT):
+    """Fresh directory for a build; nothing reads it until publish() points CURRENT at it."""
+    version = time.strftime("v%Y%m%d-%H%M%S")
+    path = os.path.join(root, version)
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(root, f"{version}-{suffix}")
+    os.makedirs(path)
+    return path
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_files(version_dir):
+    for folder, _, names in os.walk(version_dir):
+        for name in names:
+            path = os.path.join(folder, name)
+            relative = os.path.relpath(path, version_dir).replace(os.sep, "/")
+            if relative != MANIFEST_FILE:
+                yield relative, path
+
+
+def write_manifest(version_dir, **details):
+    """Checksums every artifact in the build; details: model, dimension, chunks, ..."""
+    files = {relative: {"sha256": file_checksum(path), "bytes": os.path.getsize(path)}
+             for relative, path in sorted(artifact_files(version_dir))}
+    manifest = dict(details, version=os.path.basename(version_dir),
+                    created=time.strftime("%Y-%m-%dT%H:%M:%S"), files=files)
+    with open(os.path.join(version_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+
+def read_manifest(version_dir):
+    with open(os.path.join(version_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify(version_dir):
+    """Raises IndexVersionError unless every artifact matches its manifest checksum."""
+    try:
+        manifest = read_manifest(version_dir)
+    except (OSError, ValueError) as e:
+        raise IndexVersionError(f"{version_dir}: unreadable manifest ({e})")
+    for relative, expected in manifest["files"].items():
+        path = os.path.join(version_dir, relative)
+        if not os.path.exists(path):
+            raise IndexVersionError(f"{version_dir}: missing {relative}")
+        if os.path.getsize(path) != expected["bytes"] or file_checksum(path) != expected["sha256"]:
+            raise IndexVersionError(f"{version_dir}: checksum mismatch for {relative}")
+    return manifest
+
+
+def read_pointer(root=INDEX_ROOT):
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def current_dir(root=INDEX_ROOT):
+    """Directory of the published build, or None when nothing was published (legacy flat files)."""
+    pointer = read_pointer(root)
+    return os.path.join(root, pointer["version"]) if pointer else None
+
+
+def publish(version, root=INDEX_ROOT, check=True):
+    """Points CURRENT at `version` with one os.replace, so readers see the old or the new build, never half."""
+    version = os.path.basename(os.path.normpath(version))
+    if check:
+        verify(os.path.join(root, version))
+    pointer = read_pointer(root)
+    previous = pointer["version"] if pointer else None
+    if previous == version:
+        return pointer
+    new_pointer = {"version": version, "previous": previous, "published": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    temp = os.path.join(root, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump(new_pointer, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, os.path.join(root, CURRENT_FILE))
+    prune(root, keep={version, previous})
+    return new_pointer
+
+
+def list_versions(root=INDEX_ROOT):
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if os.path.exists(os.path.join(root, name, MANIFEST_FILE)))
+
+
+def prune(root=INDEX_ROOT, keep=()):
+    for version in list_versions(root)[:-INDEX_KEEP] if INDEX_KEEP > 0 else []:
+        if version not in keep:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def artifact_path(name, root=INDEX_ROOT):
+    """`name` inside the published build, or the legacy file next to the backend."""
+    version_dir = current_dir(root)
+    return os.path.join(version_dir, name) if version_dir else name
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect, verify and publish index builds")
+    parser.add_argument("command", choices=["list", "verify", "publish", "rollback"])
+    parser.add_argument("version", nargs="?")
+    args = parser.parse_args()
+
+    pointer = read_pointer()
+    if args.command == "list":
+        for name in list_versions():
+            manifest = read_manifest(os.path.join(INDEX_ROOT, name))
+            marker = "*" if pointer and pointer["version"] == name else " "
+            print(f"{marker} {name}  {manifest.get('chunks')} chunks  {manifest.get('model')}  {manifest['created']}")
+    elif args.command == "verify":
+        version = args.version or (pointer or {}).get("version")
+        print(f"{version}: OK ({len(verify(os.path.join(INDEX_ROOT, version))['files'])} files)")
+    elif args.command == "publish":
+        print(publish(args.version))
+    elif args.command == "rollback":
+        if not pointer or not pointer.get("previous"):
+            raise SystemExit("No previous version to roll back to")
+        print(publish(pointer["previous"]))
@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import random
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import httpx
+from langchain_groq import ChatGroq
+from langchain_core.prompts import ChatPromptTemplate
+import telemetry
+from admission import check_deadline, DeadlineExceeded, RequestCancelled
+
+# --- CONFIGURATION ---
+LLM_MODEL = "llama-3.3-70b-versatile"
+# Point at a local fake (see fake_llm_server.py), e.g. GROQ_API_BASE=http://127.0.0.1:9100
+GROQ_API_BASE = os.getenv("GROQ_API_BASE") or None
+
+# Provider limits. Defaults are Groq's free tier for llama-3.3-70b-versatile; raise them per account.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "12000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # Also the HTTP pool size
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = 4
+LLM_BACKOFF_BASE = 0.5     # Seconds, doubled on every retry
+LLM_BACKOFF_CAP = 8.0
+COMPLETION_TOKEN_ESTIMATE = 300  # Reserved per call before the real usage is known
+COALESCE_POLL_INTERVAL = 0.1     # Seconds between a coalesced caller's checks of its own deadline
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled continuously at `rate` per second."""
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        # A single request larger than the bucket would wait forever; cap it
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        # Provider told us to back off (Retry-After): drain the bucket for that long
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets, matching how Groq meters usage."""
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    def acquire(self, llm_calls, estimated_tokens):
+        self.requests.acquire(llm_calls)
+        self.tokens.acquire(estimated_tokens)
+
+    def pause(self, seconds):
+        self.requests.pause(seconds)
+
+
+class LeaderGaveUp(Exception):
+    """The coalesced call's leader was cancelled or ran out of time; its followers call again."""
+
+
+def is_retryable(error):
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    if status in RETRYABLE_STATUS:
+        return True
+    # Network-level failures (groq.APIConnectionError / APITimeoutError wrap these)
+    return isinstance(error, (httpx.TransportError, TimeoutError)) or type(error).__name__ in (
+        "APIConnectionError", "APITimeoutError")
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMGateway:
+    """
+    Single entry point for every LLM-backed chain in the backend:
+    prebuilt chains, a pooled HTTP client, in-flight coalescing of identical
+    prompts, provider-aware rate limiting and retries with jittered backoff.
+    """
+
+    def __init__(self, llm=None):
+        # Keep-alive pool shared by every call, sized to the concurrency limit
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=LLM_MAX_CONCURRENCY, max_keepalive_connections=LLM_MAX_CONCURRENCY),
+            timeout=LLM_TIMEOUT,
+        )
+        # Retries are handled here (with the limiter), so the SDK's own retries are off
+        self.llm = llm or ChatGroq(
+            model_name=LLM_MODEL,
+            temperature=0,
+            base_url=GROQ_API_BASE,
+            http_client=self.http_client,
+            max_retries=0,
+        )
+        self.chains = {}
+        self.llm_calls = {}
+        self.stages = {}
+        self.limiter = RateLimiter()
+        self.concurrency = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.stats = {"upstream_calls": 0, "coalesced": 0, "retries": 0, "errors": 0}
+
+    def register_prompt(self, name, template, stage=None):
+        """Builds `prompt | llm` once. invoke() returns the AIMessage."""
+        self.register_chain(name, ChatPromptTemplate.from_template(template) | self.llm, stages=[stage or name])
+
+    def register_chain(self, name, runnable, llm_calls=1, stages=None):
+        # llm_calls = upstream requests one invoke makes (GraphCypherQAChain makes 2);
+        # stages names those calls, in order, in the latency trace
+        self.chains[name] = runnable
+        self.llm_calls[name] = llm_calls
+        self.stages[name] = stages or [name]
+
+    def invoke(self, name, inputs):
+        # Identical prompts already in flight wait for the leader's result instead of calling again
+        key = (name, json.dumps(inputs, sort_keys=True, default=str))
+        while True:
+            with self.lock:
+                future = self.in_flight.get(key)
+                leader = future is None
+                if leader:
+                    future = Future()
+                    self.in_flight[key] = future
+                else:
+                    self.stats["coalesced"] += 1
+            telemetry.record_cache("llm_inflight", hit=not leader)
+            if leader:
+                break
+            try:
+                with telemetry.span(f"{name}_coalesced_wait"):
+                    return self._wait_for_leader(name, future)
+            except LeaderGaveUp:
+                continue   # Become (or follow) the next leader
+
+        try:
+            result = self._call_with_retries(name, inputs)
+        except (RequestCancelled, DeadlineExceeded):
+            # The leader's own request gave up; that is no answer for the requests waiting on it
+            self._finish(key, future, error=LeaderGaveUp())
+            raise
+        except Exception as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    def _wait_for_leader(self, name, future):
+        # Only this caller's deadline and cancellation apply while it waits
+        while True:
+            try:
+                return future.result(timeout=COALESCE_POLL_INTERVAL)
+            except FutureTimeout:
+                check_deadline(f"{name}_coalesced_wait")
+
+    def _finish(self, key, future, result=None, error=None):
+        # Out of in_flight first, so followers retrying after LeaderGaveUp start a new call
+        with self.lock:
+            self.in_flight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _call_with_retries(self, name, inputs):
+        chain = self.chains[name]
+        llm_calls = self.llm_calls[name]
+        estimated_tokens = len(json.dumps(inputs, default=str)) // 4 + COMPLETION_TOKEN_ESTIMATE * llm_calls
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            # Don't spend quota (or a retry) on a request whose client has given up
+            check_deadline(f"{name}_llm_call")
+            # A fresh callback per attempt times each upstream call and reads its real token usage
+            callback = telemetry.LLMStageCallback(self.stages[name], telemetry.current_trace())
+            try:
+                with telemetry.queued("llm_gateway"):
+                    self.limiter.acquire(llm_calls, estimated_tokens)
+                    self.concurrency.acquire()
+                try:
+                    self.count("upstream_calls")
+                    return chain.invoke(inputs, config={"callbacks": [callback]})
+                finally:
+                    self.concurrency.release()
+            except Exception as e:
+                if attempt == LLM_MAX_RETRIES or not is_retryable(e):
+                    self.count("errors")
+                    raise
+                self.count("retries")
+                # Full jitter: sleep a random time up to the exponential cap
+                delay = random.uniform(0, min(LLM_BACKOFF_CAP, LLM_BACKOFF_BASE * (2 ** attempt)))
+                retry_after = retry_after_seconds(e)
+                if retry_after:
+                    self.limiter.pause(retry_after)
+                    delay = max(delay, retry_after)
+                print(f"⚠️ LLM '{name}' failed ({e}); retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def summary(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def close(self):
+        self.http_client.close()
@@ -1,10 +1,29 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse, Response, PlainTextResponse
+from starlette.background import BackgroundTask
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from pydantic import BaseModel, Field
+from typing import List, Optional
 import uvicorn
 import os
+import json
+import hmac
+import threading
 from hybrid_rag2 import HybridRAG
+from session_store import SessionStore
+from source_excerpts import SourceExcerpts, SourceNotFound, parse_range
+from trace_store import TraceStore
+from suggest_index import SuggestIndex
+import session_store
+import trace_store
+from profiling import PROFILE_INTERVAL, PROFILE_MAX_SECONDS, ProfilerBusy, collapsed, memory, sampler, top_functions
+from llm_gateway import is_retryable
+from index_versions import IndexVersionError
+from admission import AdmissionController, RequestContext, Overloaded, DeadlineExceeded, RequestCancelled
+import telemetry
 
 app = FastAPI(title="Enterprise Chatbot API")
 
@@ -17,6 +36,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 1b. COMPRESSION for JSON responses. Not for page excerpts and PDFs (byte ranges must refer to the
+# uncompressed body) nor the NDJSON batch stream (gzip would hold lines back until its buffer fills).
+UNCOMPRESSED_PATHS = ("/api/source/", "/static/", "/api/chat/batch")
+
+class JSONGZipMiddleware(GZipMiddleware):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(UNCOMPRESSED_PATHS):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(JSONGZipMiddleware, minimum_size=1000)
+
 # 2. SERVE PDF FILES (UPDATED FIX)
 # We now point explicitly to the 'data/pdf' subfolder
 # URL will be: http://localhost:8000/static/filename.pdf
@@ -30,8 +62,18 @@ os.makedirs(pdf_directory, exist_ok=True)
 # Mount the specific PDF folder to /static
 app.mount("/static", StaticFiles(directory=pdf_directory), name="static")
 
+MAX_BATCH_SIZE = 500  # Questions accepted per /api/chat/batch call
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # Required in X-Admin-Token for /api/admin/*; unset = admin endpoints off
+
 class QuestionRequest(BaseModel):
     query: str
+    # Omit to start a new conversation; the response carries the id to send with follow-ups
+    session_id: Optional[str] = Field(default=None, max_length=64)
+    # Reasoning context is served by /api/trace/{trace_id}; set this to get it inline as well
+    include_thoughts: bool = False
+
+class BatchQuestionRequest(BaseModel):
+    queries: List[str]
 
 print("⏳ Booting up AI Engine...")
 try:
@@ -41,15 +83,205 @@ except Exception as e:
     print(f"❌ Failed to start AI Engine: {e}")
     bot = None
 
+sessions = SessionStore()
+traces = TraceStore()
+suggestions = SuggestIndex()
+excerpts = SourceExcerpts()
+admission = AdmissionController()
+
+def slim_response(query, response, include_thoughts=False):
+    # The retrieved context is most of the payload and only shown on demand: keep it server-side
+    thoughts = response.pop("thoughts", None)
+    if thoughts is not None:
+        response["trace_id"] = traces.put(query, thoughts)
+        if include_thoughts:
+            response["thoughts"] = thoughts
+    return response
+
+def require_admin(request):
+    # Off unless configured: these block workers, slow allocations and swap indexes, and CORS is open
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if not bot:
+        raise HTTPException(status_code=500, detail="AI Engine is offline")
+
+def overloaded_error(e):
+    return HTTPException(status_code=e.status, detail=f"Server busy ({e.reason}), please retry",
+                         headers={"Retry-After": str(e.retry_after)})
+
 @app.post("/api/chat")
-async def chat_endpoint(request: QuestionRequest):
+async def chat_endpoint(body: QuestionRequest, request: Request):
     if not bot:
         raise HTTPException(status_code=500, detail="AI Engine is offline")
+    # X-Priority: interactive (default) or batch; interactive always gets freed slots first
+    priority = request.headers.get("x-priority", "interactive")
+    context = RequestContext()
     try:
-        response = bot.ask(request.query)
-        return response
+        with telemetry.queued("chat_requests"):
+            response = await admission.submit(request, priority, context, bot.ask, body.query,
+                                              session=sessions.get_or_create(body.session_id))
+        suggestions.record(body.query, response.get("session_id"))
+        return slim_response(body.query, response, body.include_thoughts)
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+    except RequestCancelled:
+        # Client closed the connection; nobody reads this, nginx-style 499 for the access log
+        return Response(status_code=499)
     except Exception as e:
+        # Upstream still rate limited / unavailable after the gateway's retries
+        if is_retryable(e):
+            raise HTTPException(status_code=503, detail="LLM provider is busy, please retry", headers={"Retry-After": "5"})
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/batch")
+async def chat_batch_endpoint(request: BatchQuestionRequest):
+    # Streams one JSON object per line (NDJSON) in completion order; each carries its "index"
+    if not bot:
+        raise HTTPException(status_code=500, detail="AI Engine is offline")
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries provided")
+    if len(request.queries) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch limit is {MAX_BATCH_SIZE} queries")
+
+    # A whole batch holds one slot at batch priority, so it can't crowd out interactive users
+    try:
+        await admission.acquire("batch", RequestContext())
+    except Overloaded as e:
+        raise overloaded_error(e)
+
+    once = threading.Lock()
+
+    def release_slot():
+        # Runs from the generator or the background task, whichever comes first (a client that
+        # disconnects before the first line never starts the generator)
+        if once.acquire(blocking=False):
+            admission.release(0.0)   # Long batches would skew the per-request service time estimate
+
+    def stream_results():
+        try:
+            for result in bot.ask_batch(request.queries):
+                yield json.dumps(slim_response(request.queries[result["index"]], result)) + "\n"
+        finally:
+            release_slot()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson",
+                             background=BackgroundTask(release_slot))
+
+@app.get("/api/source/{filename}")
+def source_endpoint(filename: str, request: Request, page: int = Query(1, ge=1),
+                    format: str = Query("text", pattern="^(text|pdf)$")):
+    # One cited page (text, or a single-page PDF) instead of the whole document under /static
+    try:
+        body, media_type, etag = excerpts.get(filename, page, format)
+    except SourceNotFound:
+        raise HTTPException(status_code=404, detail="Source not found")
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400", "Accept-Ranges": "bytes"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, len(body))
+        except ValueError:
+            return Response(status_code=416, headers=dict(headers, **{"Content-Range": f"bytes */{len(body)}"}))
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            return Response(body[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+
+    return Response(body, media_type=media_type, headers=headers)
+
+@app.get("/api/suggest")
+async def suggest_endpoint(q: str = Query("", max_length=200), limit: int = Query(8, ge=1, le=20)):
+    # Called per keystroke: async so the sub-millisecond lookup skips the threadpool hop
+    return {"query": q, "suggestions": suggestions.suggest(q, limit)}
+
+@app.get("/api/trace/{trace_id}")
+def trace_endpoint(trace_id: str):
+    trace = traces.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found or expired")
+    # A trace never changes once stored
+    return Response(json.dumps(trace), media_type="application/json",
+                    headers={"Cache-Control": "private, max-age=1800, immutable"})
+
+@app.get("/api/cache/stats")
+def cache_stats_endpoint():
+    if not bot:
+        raise HTTPException(status_code=500, detail="AI Engine is offline")
+    return {
+        "graph_query": bot.graph.cache.summary() if bot.graph else None,
+        "llm_gateway": bot.gateway.summary(),
+        "sessions": len(sessions),
+        "traces": traces.summary(),
+        "suggest": suggestions.summary(),
+        "admission": admission.summary(),
+    }
+
+@app.get("/api/admin/index")
+def index_status_endpoint(request: Request):
+    require_admin(request)
+    return bot.index_summary()
+
+@app.post("/api/admin/index/reload")
+def index_reload_endpoint(request: Request):
+    # Loads and verifies the build indexes/CURRENT points at; questions already running finish on the old one
+    require_admin(request)
+    try:
+        swapped = bot.reload_index()
+    except (IndexVersionError, OSError, ValueError) as e:
+        raise HTTPException(status_code=409, detail=f"Index build rejected: {e}")
+    return dict(bot.index_summary(), swapped=swapped)
+
+@app.post("/api/admin/index/rollback")
+def index_rollback_endpoint(request: Request):
+    require_admin(request)
+    try:
+        bot.rollback_index()
+    except IndexVersionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return bot.index_summary()
+
+@app.post("/api/admin/profile")
+def profile_endpoint(request: Request, seconds: float = Query(30, gt=0, le=PROFILE_MAX_SECONDS),
+                     requests: Optional[int] = Query(None, ge=1), interval: float = Query(PROFILE_INTERVAL, ge=0.001),
+                     format: str = Query("collapsed", pattern="^(collapsed|json)$")):
+    # Blocks until `requests` questions have been answered or `seconds` have passed
+    require_admin(request)
+    try:
+        profile = sampler.run(seconds=seconds, requests=requests, interval=interval)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "json":
+        return dict(profile, top=top_functions(profile))
+    headers = {f"X-Profile-{key.title()}": str(profile[key]) for key in ("seconds", "samples", "requests")}
+    return PlainTextResponse(collapsed(profile), headers=headers)
+
+@app.get("/api/admin/memory")
+def memory_endpoint(request: Request, top: int = Query(20, ge=1, le=200)):
+    require_admin(request)
+    components = dict(bot.memory_components(),
+                      sessions=(sessions.sessions, [session_store]),
+                      traces=(traces, [trace_store]))
+    return memory.report(components, top=top)
+
+@app.post("/api/admin/memory/tracemalloc")
+def tracemalloc_endpoint(request: Request, frames: int = Query(25, ge=0, le=100)):
+    # frames=0 stops tracing; tracing slows allocations down, so leave it on only while diagnosing
+    require_admin(request)
+    return {"tracing": memory.start(frames), "frames": frames}
+
+@app.get("/metrics")
+def metrics_endpoint():
+    # Prometheus scrape target: stage latency histograms, cache hits, queue depth, errors
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -3,13 +3,22 @@ import os
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from dedup import dedup_chunks
+from vector_store import SHARD_DIR, write_shards
+from index_versions import new_version_dir, publish, write_manifest
+from email_index import EMAIL_INDEX_FILE, build_email_index
+from document_index import write_document_index
 
 # --- CONFIGURATION ---
 INPUT_FILE = "processed_data.json"
 FAISS_INDEX_FILE = "vector_store.faiss"
 METADATA_FILE = "faiss_metadata.json"
 MODEL_NAME = "all-MiniLM-L6-v2"  # Small, fast, and free model
+DEDUP = os.getenv("DEDUP", "1") != "0"  # Collapse near-duplicate chunks before embedding
+VECTOR_SHARDS = int(os.getenv("VECTOR_SHARDS", "1"))  # > 1 writes vector_shards/ instead of one index file
+SHARD_PARTITION = os.getenv("SHARD_PARTITION", "source")  # "source" (whole documents per shard) or "hash"
+PUBLISH = os.getenv("PUBLISH_INDEX", "1") != "0"  # 0 = write the build but leave indexes/CURRENT alone
+DOCUMENT_INDEX = os.getenv("DOCUMENT_INDEX", "1") != "0"  # Pooled per-document index for two-stage retrieval
 
 def main():
     print("--- STARTING EMBEDDING PIPELINE (FAISS) ---")
@@ -21,48 +30,58 @@ def main():
     
     with open(INPUT_FILE, "r", encoding="utf-8") as f:
         raw_documents = json.load(f)
-    print(f"Loaded {len(raw_documents)} source documents.")
+    print(f"Loaded {len(raw_documents)} chunks.")
 
-    # 2. SETUP MODEL & SPLITTER
+    # 2. SETUP MODEL
     print("Loading Embedding Model (this may take a moment)...")
     model = SentenceTransformer(MODEL_NAME)
-    
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,       # Per mentor's screenshot
-        chunk_overlap=100     # Per mentor's screenshot
-    )
 
-    # 3. CHUNK & EMBED
-    all_embeddings = []
+    # 3. COLLECT CHUNKS
+    # data_ingestion/main.py already cut token-sized, sentence-aligned chunks (data_ingestion/chunker.py);
+    # they are embedded as-is instead of being split a second time.
     all_metadata = []
+    email_headers = {}   # file name -> From/To/Date/Subject/thread parsed by data_ingestion/email_ingestion.py
+    if raw_documents and "chunker" not in raw_documents[0].get("metadata", {}):
+        print("Warning: processed_data.json predates the single-pass chunker; re-run data_ingestion/main.py.")
     
     print("Processing documents...")
     for doc in raw_documents:
-        # Extract text and existing metadata
-        full_text = doc.get("content", "")
+        text = doc.get("content", "")
         base_metadata = doc.get("metadata", {})
-        
-        # Split text into smaller chunks
-        chunks = text_splitter.split_text(full_text)
-        
-        for chunk_text in chunks:
-            # Generate Embedding (Vector)
-            # encode() returns a numpy array
-            vector = model.encode(chunk_text)
-            
-            # Add to our list
-            all_embeddings.append(vector)
-            
-            # Store the text + metadata separately (FAISS can't store text!)
-            all_metadata.append({
-                "text": chunk_text,
-                "source": base_metadata.get("source", "unknown"),
-                "original_id": base_metadata.get("doc_id", "N/A")
-            })
+        source = base_metadata.get("source", "unknown")
+        start = base_metadata.get("start_index", 0)
+        if not text.strip():
+            continue
+        file_name = base_metadata.get("file_name") or base_metadata.get("filename") or os.path.basename(source)
+        if base_metadata.get("email"):
+            email_headers[file_name] = base_metadata["email"]
 
+        # Store the text + metadata separately (FAISS can't store text!)
+        all_metadata.append({
+            "text": text,
+            "source": source,
+            "original_id": base_metadata.get("doc_id", "N/A"),
+            "file_name": file_name,
+            "table": base_metadata.get("table"),   # Database rows (source "db"): which table they came from
+            "page": base_metadata.get("page"),   # 0-based, as PyPDFLoader reports it
+            "start_index": start,
+            "end_index": base_metadata.get("end_index", start + len(text))
+        })
+
+    # 4. DEDUP
+    # Templated emails, ticket sentences and PDF headers/footers would otherwise fill the top-k
+    # with copies of one text; each kept chunk lists every source it stands for.
+    total_chunks = len(all_metadata)
+    if DEDUP:
+        all_metadata, dropped = dedup_chunks(all_metadata)
+        print(f"Dedup: {total_chunks} chunks -> {len(all_metadata)} ({dropped} near-duplicates merged).")
+
+    # 5. EMBED
+    all_embeddings = model.encode([m["text"] for m in all_metadata], batch_size=64, show_progress_bar=True) \
+        if all_metadata else []
     print(f"Generated {len(all_embeddings)} vectors.")
 
-    # 4. BUILD FAISS INDEX
+    # 6. BUILD FAISS INDEX
     if len(all_embeddings) == 0:
         print("No embeddings generated. Exiting.")
         return
@@ -73,26 +92,56 @@ def main():
     # Get vector dimension (384 for all-MiniLM-L6-v2)
     dimension = embedding_matrix.shape[1]
     
-    # Create the Index (L2 = Euclidean Distance)
-    index = faiss.IndexFlatL2(dimension)
-    
-    # Add vectors to index
-    index.add(embedding_matrix)
-    print(f"FAISS Index built with {index.ntotal} vectors.")
+    # 7. SAVE TO DISK
+    # Every build goes to its own directory; the running backend only sees it once it is published
+    build_dir = new_version_dir()
+    print(f"Saving files to {build_dir} ...")
 
-    # 5. SAVE TO DISK
-    print("Saving files...")
-    
-    # Save the Vector Index
-    faiss.write_index(index, FAISS_INDEX_FILE)
+    if VECTOR_SHARDS > 1:
+        # Each shard is a separate flat index; HybridRAG searches them in parallel and merges the top-k
+        manifest = write_shards(embedding_matrix, all_metadata, VECTOR_SHARDS, SHARD_PARTITION,
+                                os.path.join(build_dir, SHARD_DIR))
+        print(f"FAISS shards built: {[entry['count'] for entry in manifest['files']]} vectors "
+              f"({SHARD_PARTITION} partitioning)")
+    else:
+        # Create the Index (L2 = Euclidean Distance)
+        index = faiss.IndexFlatL2(dimension)
+
+        # Add vectors to index
+        index.add(embedding_matrix)
+        print(f"FAISS Index built with {index.ntotal} vectors.")
+
+        # Save the Vector Index
+        faiss.write_index(index, os.path.join(build_dir, FAISS_INDEX_FILE))
     
     # Save the Metadata Map (Text)
-    with open(METADATA_FILE, "w", encoding="utf-8") as f:
+    with open(os.path.join(build_dir, METADATA_FILE), "w", encoding="utf-8") as f:
         json.dump(all_metadata, f, indent=4)
         
+    # Header indexes point at final FAISS rows, so they are built after dedup
+    if email_headers:
+        email_index = build_email_index(all_metadata, email_headers)
+        with open(os.path.join(build_dir, EMAIL_INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(email_index, f)
+        print(f"Email index: {len(email_index['messages'])} messages, {len(email_index['threads'])} threads.")
+
+    # First retrieval stage: one pooled embedding per source file/table, over the final (deduplicated) rows
+    if DOCUMENT_INDEX:
+        documents = write_document_index(embedding_matrix, all_metadata, build_dir)
+        print(f"Document index: {documents} documents over {len(all_metadata)} chunks.")
+
+    # 8. PUBLISH: checksum manifest, then one atomic switch of indexes/CURRENT
+    write_manifest(build_dir, model=MODEL_NAME, dimension=int(dimension), chunks=len(all_metadata),
+                   shards=VECTOR_SHARDS if VECTOR_SHARDS > 1 else None, dedup=DEDUP, document_index=DOCUMENT_INDEX)
+    if PUBLISH:
+        pointer = publish(build_dir)
+        print(f"Published {pointer['version']} (previous: {pointer['previous']}); "
+              f"running backends pick it up without a restart.")
+
     print("\nSUCCESS! Pipeline Complete.")
-    print(f"1. Vectors saved to: {FAISS_INDEX_FILE}")
-    print(f"2. Text map saved to: {METADATA_FILE}")
+    print(f"1. Build saved to: {build_dir}")
+    if not PUBLISH:
+        print(f"2. Publish it with: python index_versions.py publish {os.path.basename(build_dir)}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
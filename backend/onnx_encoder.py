@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from index_versions import artifact_path
+
+# --- CONFIGURATION ---
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+ONNX_DIR = "onnx_model"
+ONNX_FP32_FILE = os.path.join(ONNX_DIR, "model.onnx")
+ONNX_INT8_FILE = os.path.join(ONNX_DIR, "model_int8.onnx")
+METADATA_FILE = "faiss_metadata.json"
+MAX_SEQ_LENGTH = 256      # Same truncation as the SentenceTransformer config
+PARITY_THRESHOLD = 0.99   # Minimum mean cosine vs. PyTorch to accept the int8 model
+
+
+def export_onnx(model_name=EMBEDDING_MODEL, output_dir=ONNX_DIR):
+    """Exports the transformer to ONNX and writes a dynamic int8 copy next to it."""
+    # Heavy imports stay local: the serving path only needs onnxruntime + tokenizers
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_file = os.path.join(output_dir, "model.onnx")
+    int8_file = os.path.join(output_dir, "model_int8.onnx")
+
+    print(f"--- Exporting {model_name} to ONNX ---")
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model
+    transformer.eval()
+
+    # Saves tokenizer.json so the runtime does not need transformers/torch
+    model.tokenizer.save_pretrained(output_dir)
+
+    sample = model.tokenizer(["export sample"], return_tensors="pt")
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "sequence"},
+        "attention_mask": {0: "batch", 1: "sequence"},
+        "token_type_ids": {0: "batch", 1: "sequence"},
+        "last_hidden_state": {0: "batch", 1: "sequence"},
+    }
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            fp32_file,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state", "pooler_output"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            dynamo=False,   # TorchScript exporter: honours dynamic_axes/opset 14 and needs no onnxscript
+        )
+    print(f"✅ FP32 model saved to: {fp32_file}")
+
+    # Dynamic quantization: int8 weights, activations quantized on the fly
+    quantize_dynamic(fp32_file, int8_file, weight_type=QuantType.QInt8)
+    print(f"✅ INT8 model saved to: {int8_file}")
+    return int8_file
+
+
+class OnnxEncoder:
+    """Drop-in replacement for SentenceTransformer.encode() backed by ONNX Runtime."""
+
+    def __init__(self, model_dir=ONNX_DIR, quantized=True, num_threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_file = os.path.join(model_dir, "model_int8.onnx" if quantized else "model.onnx")
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(f"{model_file} missing! Run: python onnx_encoder.py export")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(["last_hidden_state"], feeds)[0]
+
+        # Mean pooling over real tokens (same as the SentenceTransformer Pooling layer)
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return summed / counts
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=True, **kwargs):
+        # Accepts the same call shapes as SentenceTransformer: a string or a list of strings.
+        # Extra kwargs (show_progress_bar, convert_to_numpy...) are accepted and ignored.
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        if not sentences:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # Sort by length so each batch pads to a similar size, then restore the order
+        order = np.argsort([-len(s) for s in sentences])
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            batch = [sentences[i] for i in order[start:start + batch_size]]
+            batches.append(self._encode_batch(batch))
+        embeddings = np.empty((len(sentences), batches[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.vstack(batches)
+
+        # all-MiniLM-L6-v2 ships a Normalize layer, so unit vectors match the PyTorch output
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self):
+        return self.session.get_outputs()[0].shape[-1]
+
+
+def load_corpus_sample(limit):
+    with open(artifact_path(METADATA_FILE), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    return [m["text"] for m in metadata[:limit]]
+
+
+def parity_check(limit=2000, quantized=True):
+    """Cosine agreement between ONNX and PyTorch embeddings on our own chunks."""
+    from sentence_transformers import SentenceTransformer
+
+    texts = load_corpus_sample(limit)
+    print(f"--- Parity check on {len(texts)} corpus chunks ---")
+
+    reference = SentenceTransformer(EMBEDDING_MODEL, device="cpu").encode(texts, batch_size=64)
+    candidate = OnnxEncoder(quantized=quantized).encode(texts, batch_size=64)
+
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cosines = (reference * candidate).sum(axis=1)
+
+    # Retrieval agreement: does the nearest neighbour of each chunk stay the same?
+    top_ref = np.argsort(-(reference @ reference.T), axis=1)[:, 1]
+    top_onnx = np.argsort(-(candidate @ candidate.T), axis=1)[:, 1]
+
+    report = {
+        "chunks": len(texts),
+        "quantized": quantized,
+        "cosine_mean": round(float(cosines.mean()), 5),
+        "cosine_min": round(float(cosines.min()), 5),
+        "cosine_p01": round(float(np.percentile(cosines, 1)), 5),
+        "nearest_neighbour_agreement": round(float((top_ref == top_onnx).mean()), 4),
+    }
+    print(json.dumps(report, indent=4))
+    if report["cosine_mean"] < PARITY_THRESHOLD:
+        print(f"❌ Mean cosine below {PARITY_THRESHOLD}. Do not serve this model.")
+        return False
+    print("✅ Parity OK")
+    return True
+
+
+def _time_encoder(encoder, queries, batch_texts):
+    # Warm-up so graph optimization / lazy init is not measured
+    encoder.encode(queries[:4])
+
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        encoder.encode([q])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    encoder.encode(batch_texts, batch_size=64)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "batch_throughput_per_s": round(len(batch_texts) / elapsed, 1),
+    }
+
+
+def benchmark(threads=(1, 2, 4), samples=200):
+    """Single-query latency and batch throughput for PyTorch vs. ONNX int8 per thread count."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    texts = load_corpus_sample(max(samples, 500))
+    queries = [t[:120] for t in texts[:samples]]
+    results = []
+
+    for n in threads:
+        print(f"--- Benchmarking with {n} thread(s) ---")
+        torch.set_num_threads(n)
+        torch_encoder = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+        row = {"threads": n, "torch": _time_encoder(torch_encoder, queries, texts)}
+        row["onnx_int8"] = _time_encoder(OnnxEncoder(num_threads=n), queries, texts)
+        row["speedup_p50"] = round(row["torch"]["query_p50_ms"] / row["onnx_int8"]["query_p50_ms"], 2)
+        results.append(row)
+        print(json.dumps(row, indent=4))
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ONNX/int8 runtime for the query encoder")
+    parser.add_argument("command", choices=["export", "parity", "bench"])
+    parser.add_argument("--limit", type=int, default=2000, help="Corpus chunks used for the parity check")
+    parser.add_argument("--fp32", action="store_true", help="Check the unquantized model instead")
+    parser.add_argument("--threads", default="1,2,4", help="Comma-separated thread counts to benchmark")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx()
+    elif args.command == "parity":
+        sys.exit(0 if parity_check(args.limit, quantized=not args.fp32) else 1)
+    else:
+        benchmark(tuple(int(t) for t in args.threads.split(",")))
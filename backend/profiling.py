@@ -0,0 +1,241 @@
+import os
+import sys
+import time
+import inspect
+import threading
+import tracemalloc
+from collections import Counter, deque
+from contextlib import contextmanager
+import numpy as np
+
+# --- CONFIGURATION ---
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))   # Seconds between stack samples
+PROFILE_MAX_SECONDS = 300      # Upper bound on any profiling window
+# Frames (file, function) a profiled stack is rooted at: HybridRAG.ask and the pool workers it fans out to
+PROFILE_ROOTS = {("hybrid_rag2.py", name) for name in ("ask", "ask_batch", "answer", "get_graph_context")}
+# > 0 starts tracemalloc at import, before the embedder and index are loaded, keeping this many frames
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "0"))
+MEMORY_TOP = 20
+
+if TRACEMALLOC_FRAMES > 0:
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def frame_label(code):
+    # "function (file:line)", the frame format flamegraph.pl and speedscope read
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for HybridRAG.ask: a background thread reads every thread's stack
+    each `interval` and counts the ones inside ask (or its pool workers), as collapsed stacks.
+    Nothing runs while it is off, apart from the one flag check in request().
+    """
+
+    def __init__(self):
+        self.running = False
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.stacks = Counter()
+        self.samples = 0
+        self.requests = 0
+        self.max_requests = None
+
+    @contextmanager
+    def request(self):
+        # Wraps one HybridRAG.ask; only counts toward a "next N requests" window
+        yield
+        if self.running:
+            with self.lock:
+                self.requests += 1
+                if self.max_requests and self.requests >= self.max_requests:
+                    self.done.set()
+
+    def run(self, seconds=30.0, requests=None, interval=PROFILE_INTERVAL):
+        """Samples until `requests` asks have finished or `seconds` have passed, whichever is first."""
+        with self.lock:
+            if self.running:
+                raise ProfilerBusy("A profile is already being recorded")
+            self.running = True
+            self.stacks = Counter()
+            self.samples = self.requests = 0
+            self.max_requests = requests
+            self.done.clear()
+        seconds = min(seconds, PROFILE_MAX_SECONDS)
+        start = time.monotonic()
+        try:
+            sampler = threading.get_ident()
+            while not self.done.wait(interval) and time.monotonic() - start < seconds:
+                self.sample(sampler)
+        finally:
+            with self.lock:
+                self.running = False
+        return {"seconds": round(time.monotonic() - start, 3), "interval": interval, "samples": self.samples,
+                "requests": self.requests, "stacks": dict(self.stacks)}
+
+    def sample(self, skip):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip:
+                continue
+            stack = []
+            root = None
+            while frame is not None:
+                code = frame.f_code
+                stack.append(frame_label(code))
+                if (os.path.basename(code.co_filename), code.co_name) in PROFILE_ROOTS:
+                    root = len(stack)   # Keep the outermost one
+                frame = frame.f_back
+            if root is not None:
+                self.stacks[";".join(reversed(stack[:root]))] += 1
+        self.samples += 1
+
+
+def collapsed(profile):
+    """One "root;...;leaf count" line per stack (flamegraph.pl, speedscope, inferno)."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(profile["stacks"].items()))
+
+
+def top_functions(profile, limit=25):
+    # Self = samples where the function was the leaf; total = samples with it anywhere on the stack
+    own, total = Counter(), Counter()
+    for stack, count in profile["stacks"].items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for label in set(frames):
+            total[label] += count
+    return [{"function": label, "self": own[label], "total": count} for label, count in total.most_common(limit)]
+
+
+sampler = SamplingProfiler()
+
+
+# --- MEMORY ---
+def deep_size(obj):
+    """Bytes held by an object graph of Python containers (arrays by their buffer size)."""
+    seen = set()
+    pending = [obj]
+    size = 0
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, np.ndarray):
+            size += item.nbytes
+            continue
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            pending.extend(item)
+        elif hasattr(item, "__dict__") and not isinstance(item, type):
+            pending.append(vars(item))
+    return size
+
+
+def component_size(obj):
+    """Best estimate for one component; torch and faiss allocate outside the Python heap."""
+    if obj is None:
+        return 0
+    if hasattr(obj, "parameters") and hasattr(obj, "buffers"):
+        tensors = list(obj.parameters()) + list(obj.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    if hasattr(obj, "shards"):
+        # ShardedIndex: shards served by other processes take no memory here
+        return sum(component_size(shard.index) for shard in obj.shards if hasattr(shard, "index"))
+    if hasattr(obj, "ntotal") and hasattr(obj, "d"):
+        return obj.ntotal * obj.d * 4   # Flat float32 vectors
+    if hasattr(obj, "total_bytes"):
+        return obj.total_bytes          # Caches that already account for their entries
+    if hasattr(obj, "session") and hasattr(obj, "tokenizer"):
+        return None                     # ONNX Runtime session: not measurable from Python
+    return deep_size(obj)
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def source_span(owner):
+    # (file, first line, last line) of a function, class or module
+    lines, start = inspect.getsourcelines(owner)
+    return os.path.abspath(inspect.getsourcefile(owner)), max(start, 1), max(start, 1) + len(lines) - 1
+
+
+class MemoryProfiler:
+    """tracemalloc snapshots, with each allocation charged to the component whose code made it."""
+
+    def __init__(self):
+        self.previous = None
+
+    def start(self, frames):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.previous = None
+        if frames > 0:
+            # Only allocations made from now on are traced; set TRACEMALLOC_FRAMES to cover startup
+            tracemalloc.start(frames)
+        return tracemalloc.is_tracing()
+
+    def report(self, components, top=MEMORY_TOP):
+        """components: name -> (object, [functions/classes/modules whose allocations belong to it])."""
+        report = {"rss_bytes": rss_bytes(),
+                  "components": {name: component_size(obj) for name, (obj, _) in components.items()},
+                  "tracemalloc": None}
+        if not tracemalloc.is_tracing():
+            return report
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ])
+        spans = [(name, span) for name, (_, owners) in components.items()
+                 for span in map(source_span, owners)]
+        by_component = Counter()
+        for stat in snapshot.statistics("traceback"):
+            by_component[self.owner_of(stat.traceback, spans)] += stat.size
+
+        current, peak = tracemalloc.get_traced_memory()
+        report["tracemalloc"] = {
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "by_component": dict(by_component.most_common()),
+            "top_lines": [{"line": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count}
+                          for stat in snapshot.statistics("lineno")[:top]],
+        }
+        if self.previous is not None:
+            # What grew since the last report: the place to look when RSS keeps climbing
+            report["tracemalloc"]["growth"] = [
+                {"line": str(stat.traceback[0]), "bytes": stat.size_diff, "count": stat.count_diff}
+                for stat in snapshot.compare_to(self.previous, "lineno")[:top] if stat.size_diff
+            ]
+        self.previous = snapshot
+        return report
+
+    @staticmethod
+    def owner_of(traceback, spans):
+        # Innermost owning frame wins (EmailIndex.load inside IndexBundle counts as the email index)
+        for frame in reversed(traceback):
+            filename = os.path.abspath(frame.filename)
+            for name, (owner_file, first, last) in spans:
+                if filename == owner_file and first <= frame.lineno <= last:
+                    return name
+        return "other"
+
+
+memory = MemoryProfiler()
@@ -0,0 +1,242 @@
+import os
+import re
+import json
+import time
+import queue
+import atexit
+import threading
+import numpy as np
+import telemetry
+
+# --- CONFIGURATION ---
+ROUTES = ("vector", "graph", "structured")
+SELECT_THRESHOLD = 0.35     # Combined score a route needs to be consulted
+CONFIDENCE_FLOOR = 0.45     # Below this best score the router isn't sure: consult everything
+CLASSIFIER_TEMPERATURE = 0.05
+WEIGHTS = {"classifier": 0.5, "rules": 0.3, "entities": 0.2}
+ROUTER_ENTITY_KINDS = ("employee", "product", "customer", "project")   # Department names are common words
+ROUTER_LOG = os.getenv("ROUTER_LOG", "router_decisions.jsonl")   # "" disables decision logging
+ROUTER_LOG_MAX_BYTES = int(os.getenv("ROUTER_LOG_MAX_BYTES", str(20 * 1024 * 1024)))   # Rotated to .1, .2, ... beyond this
+ROUTER_LOG_BACKUPS = 3
+ROUTER_LOG_QUEUE = 10000    # Decisions waiting for the writer thread; more are dropped, never waited for
+
+KEYWORD_RULES = {
+    "vector": re.compile(r"\b(summari[sz]e|explain|describe|policy|policies|guide|guidelines|report|agreement|"
+                         r"contract|benefits?|compendium|case study|fact sheet|email|according to|what does .* say)\b", re.I),
+    "graph": re.compile(r"\b(who|related|relationship|connected|works? (in|for|with)|reports? to|partner(ed)?|"
+                        r"associated|belongs? to|linked)\b", re.I),
+    "structured": re.compile(r"\b(how many|count|number of|total|revenue|budget|tickets?|status|open|closed|"
+                             r"designation|department|email address|largest|highest|lowest|average|list all)\b", re.I),
+}
+
+# Seed questions per route; their mean embeddings are the classifier's centroids
+ROUTE_EXAMPLES = {
+    "vector": [
+        "Summarize the leave policy.",
+        "What does the employment agreement say about termination?",
+        "Explain the benefits in the enrollment guide.",
+        "What are the principles of superior customer service?",
+        "Describe the tech for good initiatives.",
+        "What was discussed in the email about the roadmap meeting?",
+        "What is the notice period during probation?",
+        "What was the operating margin this quarter?",
+    ],
+    "graph": [
+        "Who is connected to NovaTech Solutions?",
+        "Which companies partnered with Infosys?",
+        "Who works with Arjun Mehta?",
+        "What is MarketSense related to?",
+        "Which organisations are associated with the ESG report?",
+        "Who is the CEO of Infosys?",
+    ],
+    "structured": [
+        "What is Arjun Mehta's department?",
+        "How many open tickets are there for SecureID?",
+        "Which product has the highest revenue?",
+        "Who owns the project with the largest budget?",
+        "How many employees work in Engineering?",
+        "What is the status of tickets reported by EduTech?",
+        "What is the email address of Nikhil Saxena?",
+        "List all tickets assigned to karan.chopra.",
+    ],
+}
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype="float32")
+    return matrix / (np.linalg.norm(matrix, axis=-1, keepdims=True) + 1e-12)
+
+
+class QueryRouter:
+    """
+    Picks which backends to consult for a question from three cheap signals:
+    keyword rules, entity-dictionary hits and a nearest-centroid classifier on the query vector.
+    Low confidence falls back to consulting every backend.
+    """
+
+    def __init__(self, embedder, entity_names=None, log_path=ROUTER_LOG):
+        self.entity_names = entity_names or {}   # lowercase name -> kind
+        self.entity_patterns = [re.compile(r"(?<!\w)" + re.escape(name) + r"(?!\w)")
+                                for name in sorted(self.entity_names, key=len, reverse=True)]
+        self.decision_log = DecisionLog(log_path) if log_path else None
+        centroids = []
+        for route in ROUTES:
+            vectors = normalize_rows(embedder.encode(ROUTE_EXAMPLES[route]))
+            centroids.append(vectors.mean(axis=0))
+        self.centroids = normalize_rows(centroids)
+
+    def classify(self, query_vector):
+        similarities = self.centroids @ normalize_rows(query_vector)
+        weights = np.exp((similarities - similarities.max()) / CLASSIFIER_TEMPERATURE)
+        return dict(zip(ROUTES, (weights / weights.sum()).tolist()))
+
+    def entity_hits(self, query):
+        lowered = query.lower()
+        return [p.pattern for p in self.entity_patterns if p.search(lowered)][:5]
+
+    def route(self, query, query_vector, session=None):
+        # session: session_tag() of the asking session, logged so suggestions can count distinct askers
+        start = time.perf_counter()
+        classifier = self.classify(query_vector)
+        rules = {route: 1.0 if KEYWORD_RULES[route].search(query) else 0.0 for route in ROUTES}
+        entities = self.entity_hits(query)
+        # A known employee/product/customer name points at the relationship and record backends
+        entity_score = {"vector": 0.0, "graph": 1.0 if entities else 0.0, "structured": 1.0 if entities else 0.0}
+
+        scores = {route: round(WEIGHTS["classifier"] * classifier[route] + WEIGHTS["rules"] * rules[route]
+                               + WEIGHTS["entities"] * entity_score[route], 3) for route in ROUTES}
+        confidence = max(scores.values())
+        routes = [route for route in ROUTES if scores[route] >= SELECT_THRESHOLD]
+        fallback = confidence < CONFIDENCE_FLOOR or not routes
+        if fallback:
+            routes = list(ROUTES)
+
+        decision = {
+            "query": query,
+            "routes": routes,
+            "scores": scores,
+            "confidence": round(confidence, 3),
+            "fallback": fallback,
+            "signals": {"rules": [r for r in ROUTES if rules[r]], "entities": entities,
+                        "classifier": {r: round(p, 3) for r, p in classifier.items()}},
+            "router_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+        for route in routes:
+            telemetry.record_route(route)
+        self.log(decision, session)
+        return decision
+
+    def log(self, decision, session=None):
+        if self.decision_log:
+            self.decision_log.write(dict(decision, session=session, ts=time.strftime("%Y-%m-%dT%H:%M:%S")))
+
+
+class DecisionLog:
+    """
+    JSON lines appended by a background thread, so a request only pays for a queue put.
+    The file is rotated once it passes ROUTER_LOG_MAX_BYTES, keeping ROUTER_LOG_BACKUPS old ones.
+    """
+
+    def __init__(self, path, max_bytes=ROUTER_LOG_MAX_BYTES, backups=ROUTER_LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue = queue.Queue(maxsize=ROUTER_LOG_QUEUE)
+        self.dropped = 0
+        threading.Thread(target=self.run, daemon=True, name="router-log").start()
+        atexit.register(self.queue.join)   # Flush what is queued on shutdown
+
+    def write(self, entry):
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            entries = [self.queue.get()]
+            while len(entries) < 1000:
+                try:
+                    entries.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                text = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+                self.rotate(len(text.encode("utf-8")))
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(text)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"⚠️ Router log write failed, {len(entries)} decisions lost: {e}")
+            finally:
+                for _ in entries:
+                    self.queue.task_done()
+
+    def rotate(self, incoming):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) + incoming <= self.max_bytes:
+            return
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def evaluate(router, embedder, labeled, graph_ms, vector_ms, structured_ms):
+    """
+    Routing accuracy against labeled {"question", "routes"} items, plus the backend time a
+    routed request skips compared with always consulting every backend.
+    """
+    vectors = embedder.encode([item["question"] for item in labeled])
+    exact = 0
+    needed_missed = 0
+    per_route = {route: {"tp": 0, "fp": 0, "fn": 0} for route in ROUTES}
+    saved_ms = []
+    router_ms = []
+    graph_skipped = 0
+    costs = {"vector": vector_ms, "graph": graph_ms, "structured": structured_ms}
+    for item, vector in zip(labeled, vectors):
+        decision = router.route(item["question"], vector)
+        predicted, expected = set(decision["routes"]), set(item["routes"])
+        exact += predicted == expected
+        needed_missed += bool(expected - predicted)
+        for route in ROUTES:
+            per_route[route]["tp"] += route in predicted and route in expected
+            per_route[route]["fp"] += route in predicted and route not in expected
+            per_route[route]["fn"] += route not in predicted and route in expected
+        # Backends run in parallel, so the saving is the slowest skipped backend beyond the slowest kept one
+        kept = max((costs[r] for r in predicted), default=0.0)
+        saved_ms.append(max(0.0, max(costs.values()) - kept))
+        router_ms.append(decision["router_ms"])
+        graph_skipped += "graph" not in predicted
+
+    n = len(labeled)
+    return {
+        "questions": n,
+        "exact_match": round(exact / n, 3),
+        "missed_needed_backend": round(needed_missed / n, 3),
+        "per_route": {route: {
+            "precision": round(c["tp"] / (c["tp"] + c["fp"]), 3) if c["tp"] + c["fp"] else None,
+            "recall": round(c["tp"] / (c["tp"] + c["fn"]), 3) if c["tp"] + c["fn"] else None,
+        } for route, c in per_route.items()},
+        "router_ms_mean": round(sum(router_ms) / n, 3),
+        "latency_saved_ms_mean": round(sum(saved_ms) / n, 1),
+        "graph_skipped": round(graph_skipped / n, 3),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from sentence_transformers import SentenceTransformer
+    from structured_store import StructuredStore
+
+    parser = argparse.ArgumentParser(description="Evaluate the query router on labeled questions")
+    parser.add_argument("--questions", default=os.path.join("..", "benchmarks", "router_questions.json"))
+    parser.add_argument("--graph-ms", type=float, default=1800, help="Typical graph chain latency (2 LLM calls + Neo4j)")
+    parser.add_argument("--vector-ms", type=float, default=15)
+    parser.add_argument("--structured-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    embedder = SentenceTransformer("all-MiniLM-L6-v2")
+    router = QueryRouter(embedder, StructuredStore().entity_names(ROUTER_ENTITY_KINDS), log_path="")
+    with open(args.questions, "r", encoding="utf-8") as f:
+        labeled = json.load(f)
+    print(json.dumps(evaluate(router, embedder, labeled, args.graph_ms, args.vector_ms, args.structured_ms), indent=4))
@@ -0,0 +1,114 @@
+import re
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict, deque
+import numpy as np
+
+# --- CONFIGURATION ---
+MAX_SESSIONS = 5000          # Least recently used sessions are dropped beyond this
+SESSION_TTL = 30 * 60        # Seconds of inactivity before a session expires
+MAX_TURNS = 6                # Turns kept per session (older ones fall off)
+FOLLOWUP_SIMILARITY = 0.55   # Cosine to the previous question above which we treat it as a follow-up
+MAX_CONTEXT_CHUNKS = 6       # Cap on reused + newly retrieved chunks for a follow-up
+
+# Short questions leaning on these words only make sense with the previous turn
+ANAPHORA = re.compile(r"\b(it|its|they|them|their|that|those|this|these|he|she|him|her|his|same|also)\b", re.I)
+
+
+class Turn:
+    def __init__(self, query, embedding, chunk_ids, graph_context, answer, index_version=None):
+        self.query = query
+        self.embedding = embedding          # Query vector, reused to steer follow-up searches
+        self.chunk_ids = list(chunk_ids)    # FAISS ids already retrieved for this thread of questions
+        self.index_version = index_version  # Index build the chunk ids belong to
+        self.graph_context = graph_context  # Graph entities already resolved for this subject
+        self.answer = answer
+
+
+class Session:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.turns = deque(maxlen=MAX_TURNS)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def last_turn(self):
+        with self.lock:
+            return self.turns[-1] if self.turns else None
+
+    def add_turn(self, turn):
+        with self.lock:
+            self.turns.append(turn)
+            self.updated = time.monotonic()
+
+    def history_text(self, answer_chars=300):
+        with self.lock:
+            lines = []
+            for turn in self.turns:
+                lines.append(f"User: {turn.query}")
+                lines.append(f"Assistant: {turn.answer[:answer_chars]}")
+            return "\n".join(lines)
+
+
+def is_followup(query, query_vector, previous):
+    """A follow-up either reads like one ("and who is assigned to it?") or stays on the same topic."""
+    if len(query.split()) <= 10 and ANAPHORA.search(query):
+        return True
+    a = np.asarray(query_vector, dtype="float32")
+    b = np.asarray(previous.embedding, dtype="float32")
+    cosine = float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-12))
+    return cosine >= FOLLOWUP_SIMILARITY
+
+
+def merge_chunk_ids(previous_ids, new_ids, limit=MAX_CONTEXT_CHUNKS):
+    """Keeps what the conversation already retrieved and extends it with new hits, up to `limit`."""
+    merged = [int(i) for i in new_ids if i != -1][:1]   # Always keep the best new hit
+    for idx in list(previous_ids) + [int(i) for i in new_ids if i != -1]:
+        if idx not in merged:
+            merged.append(idx)
+    return merged[:limit]
+
+
+def session_tag(session_id):
+    """Short one-way tag for logs and counters; the session id itself gives access to the conversation."""
+    return hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:12]
+
+
+class SessionStore:
+    """Bounded, expiring in-memory store: LRU on access, TTL on inactivity."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_create(self, session_id=None):
+        now = time.monotonic()
+        with self.lock:
+            self._evict_expired(now)
+            session = self.sessions.get(session_id) if session_id else None
+            if session is None:
+                # Unknown or expired ids get a fresh server-minted id: a client-chosen one could be
+                # planted on someone else to read their conversation later
+                session = Session(uuid.uuid4().hex)
+                self.sessions[session.session_id] = session
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+            else:
+                self.sessions.move_to_end(session_id)
+            session.updated = now
+            return session
+
+    def _evict_expired(self, now):
+        # Oldest first: stop at the first session that is still fresh
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session.updated < self.ttl:
+                break
+            del self.sessions[session_id]
+
+    def __len__(self):
+        return len(self.sessions)
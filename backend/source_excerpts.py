@@ -0,0 +1,115 @@
+import io
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from pypdf import PdfReader, PdfWriter
+
+# --- CONFIGURATION ---
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SOURCE_DIRS = {".pdf": os.path.join(DATA_DIR, "pdf"), ".txt": os.path.join(DATA_DIR, "emails")}
+EXCERPT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+SAFE_NAME = re.compile(r"^[\w\-. ]+$")
+
+
+class SourceNotFound(Exception):
+    pass
+
+
+class SourceExcerpts:
+    """
+    Serves one page of a source document (plain text, or a single-page PDF) instead of the whole file.
+    Excerpts are cached by (content hash, page, format), so a replaced file never serves stale pages.
+    """
+
+    def __init__(self, max_bytes=EXCERPT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()   # (digest, page, fmt) -> bytes
+        self.total_bytes = 0
+        self.hashes = {}               # path -> (mtime_ns, size, digest)
+        self.lock = threading.Lock()
+
+    def resolve(self, filename):
+        # Only bare filenames inside the data folders; no path traversal
+        if not SAFE_NAME.match(filename) or filename.startswith("."):
+            raise SourceNotFound(filename)
+        directory = SOURCE_DIRS.get(os.path.splitext(filename)[1].lower())
+        path = os.path.join(directory, filename) if directory else None
+        if not path or not os.path.isfile(path):
+            raise SourceNotFound(filename)
+        return path
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        cached = self.hashes.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        self.hashes[path] = (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+        return self.hashes[path][2]
+
+    def get(self, filename, page=1, fmt="text"):
+        """Returns (body bytes, media type, etag). `page` is 1-based; ignored for text sources."""
+        path = self.resolve(filename)
+        is_pdf = path.lower().endswith(".pdf")
+        if not is_pdf:
+            page, fmt = 1, "text"
+        digest = self.file_hash(path)
+        key = (digest, page, fmt)
+        etag = f'"{digest[:20]}-{page}-{fmt}"'
+        media_type = "application/pdf" if fmt == "pdf" else "text/plain; charset=utf-8"
+
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+                return body, media_type, etag
+
+        if not is_pdf:
+            with open(path, "rb") as f:
+                body = f.read()
+        else:
+            reader = PdfReader(path)
+            if not 1 <= page <= len(reader.pages):
+                raise SourceNotFound(f"{filename} page {page}")
+            if fmt == "pdf":
+                writer = PdfWriter()
+                writer.add_page(reader.pages[page - 1])
+                buffer = io.BytesIO()
+                writer.write(buffer)
+                body = buffer.getvalue()
+            else:
+                # Same extractor PyPDFLoader uses, so chunk offsets line up with this text
+                body = (reader.pages[page - 1].extract_text() or "").encode("utf-8")
+
+        with self.lock:
+            if key not in self.entries and len(body) <= self.max_bytes:
+                self.entries[key] = body
+                self.total_bytes += len(body)
+                while self.total_bytes > self.max_bytes:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.total_bytes -= len(evicted)
+        return body, media_type, etag
+
+
+def parse_range(header, size):
+    """
+    Single 'bytes=a-b' / 'bytes=a-' / 'bytes=-n' range -> (start, end) inclusive.
+    None for a missing or malformed header (serve the whole body); ValueError if unsatisfiable.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", (header or "").strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
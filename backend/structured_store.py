@@ -0,0 +1,119 @@
+import os
+import re
+import sqlite3
+import threading
+
+# --- CONFIGURATION ---
+STRUCTURED_DB = os.getenv("STRUCTURED_DB", os.path.join("data", "sql", "enterprise.db"))
+MAX_ROWS = 15   # Rows per entity/aggregate passed to the answer prompt
+
+COUNT_INTENT = re.compile(r"\b(how many|count|number of|total)\b", re.I)
+# Department names are ordinary words ("Product", "Sales"); only read them as one when the question says so
+DEPARTMENT_INTENT = re.compile(r"\b(department|departments|dept|team|teams)\b", re.I)
+STATUS_WORDS = {"open": "Open", "closed": "Closed", "in progress": "In Progress", "resolved": "Resolved"}
+
+
+class StructuredStore:
+    """
+    Direct lookups in the enterprise SQLite database (employees, products, tickets, projects).
+    Answers "what is X's department" / "how many open tickets for Y" without the LLM Cypher round trip.
+    """
+
+    def __init__(self, db_path=STRUCTURED_DB):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Structured database '{db_path}' not found")
+        self.db_path = db_path
+        self.local = threading.local()
+        self.entities = {}   # lowercase name -> (kind, name)
+        db = self.connection()
+        for kind, sql in (("employee", "SELECT name FROM employees"),
+                          ("product", "SELECT name FROM products"),
+                          ("customer", "SELECT DISTINCT customer FROM tickets"),
+                          ("project", "SELECT name FROM projects"),
+                          ("department", "SELECT DISTINCT department FROM employees")):
+            for (name,) in db.execute(sql):
+                self.entities.setdefault(name.lower(), (kind, name))
+        # Longest names first, so "Project-Zephyr-1" wins over a shorter overlapping name
+        self.patterns = [(re.compile(r"(?<!\w)" + re.escape(key) + r"(?!\w)"), value)
+                         for key, value in sorted(self.entities.items(), key=lambda kv: -len(kv[0]))]
+
+    def connection(self):
+        # sqlite3 connections can't be shared across threads; one read-only connection per thread
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            self.local.db = db
+        return db
+
+    def entity_names(self, kinds=None):
+        return {key: kind for key, (kind, _) in self.entities.items() if kinds is None or kind in kinds}
+
+    def match(self, query):
+        lowered = query.lower()
+        found = []
+        departments = bool(DEPARTMENT_INTENT.search(query))
+        for pattern, (kind, name) in self.patterns:
+            if kind == "department" and not departments:
+                continue
+            if pattern.search(lowered) and not any(name.lower() in f[1].lower() for f in found):
+                found.append((kind, name))
+        return found
+
+    def get_context(self, query):
+        db = self.connection()
+        lines = []
+        entities = self.match(query)
+        status = next((value for word, value in STATUS_WORDS.items() if word in query.lower()), None)
+
+        for kind, name in entities:
+            if kind == "employee":
+                for row in db.execute("SELECT name, designation, department, email FROM employees WHERE name = ?", (name,)):
+                    lines.append(f"Employee {row[0]}: {row[1]}, {row[2]} department, {row[3]}")
+                    for project in db.execute("SELECT name, budget FROM projects WHERE owner = ?", (name,)):
+                        lines.append(f"{name} owns project {project[0]} (budget {project[1]})")
+                    for ticket_status, count in db.execute(
+                            "SELECT status, COUNT(*) FROM tickets WHERE assigned_to = ? GROUP BY status", (row[3],)):
+                        lines.append(f"{name} is assigned {count} {ticket_status} ticket(s)")
+            elif kind == "product":
+                for row in db.execute("SELECT name, description, revenue FROM products WHERE name = ?", (name,)):
+                    lines.append(f"Product {row[0]}: {row[1]}, revenue {row[2]}")
+                lines.extend(self._tickets(db, "product", name, status))
+            elif kind == "customer":
+                lines.extend(self._tickets(db, "customer", name, status))
+            elif kind == "project":
+                for row in db.execute("SELECT name, owner, budget FROM projects WHERE name = ?", (name,)):
+                    lines.append(f"Project {row[0]}: owned by {row[1]}, budget {row[2]}")
+            elif kind == "department":
+                count = db.execute("SELECT COUNT(*) FROM employees WHERE department = ?", (name,)).fetchone()[0]
+                lines.append(f"{name} department has {count} employees")
+
+        # Aggregates that don't need an entity (a department only scopes headcount, not these)
+        lowered = query.lower()
+        if all(kind == "department" for kind, _ in entities):
+            if "ticket" in lowered and (COUNT_INTENT.search(query) or status):
+                for ticket_status, count in db.execute("SELECT status, COUNT(*) FROM tickets GROUP BY status"):
+                    lines.append(f"{count} tickets are {ticket_status}")
+            if "revenue" in lowered:
+                for row in db.execute("SELECT name, revenue FROM products ORDER BY revenue DESC LIMIT ?", (MAX_ROWS,)):
+                    lines.append(f"Product {row[0]} revenue {row[1]}")
+            if "budget" in lowered:
+                for row in db.execute("SELECT name, owner, budget FROM projects ORDER BY budget DESC LIMIT ?", (MAX_ROWS,)):
+                    lines.append(f"Project {row[0]} (owner {row[1]}) budget {row[2]}")
+
+        if not lines:
+            return "No matching structured records."
+        return "Structured Records: " + "; ".join(lines[:MAX_ROWS * 2])
+
+    def _tickets(self, db, column, name, status):
+        sql = f"SELECT ticket_id, customer, product, issue, assigned_to, status FROM tickets WHERE {column} = ?"
+        params = [name]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        rows = db.execute(sql + " LIMIT ?", params + [MAX_ROWS]).fetchall()
+        lines = [f"Ticket {r[0]}: {r[1]} reported '{r[3]}' on {r[2]}, {r[5]}, assigned to {r[4]}" for r in rows]
+        total = db.execute(sql.replace("ticket_id, customer, product, issue, assigned_to, status", "COUNT(*)"),
+                           params).fetchone()[0]
+        if total > len(rows):
+            lines.append(f"({total} matching tickets in total)")
+        return lines
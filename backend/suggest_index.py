@@ -0,0 +1,264 @@
+import os
+import re
+import csv
+import json
+import time
+import bisect
+import threading
+from collections import Counter
+from query_router import ROUTER_LOG
+from session_store import session_tag
+
+# --- CONFIGURATION ---
+SPREADSHEET_DIR = os.path.join("data", "spreadsheets")
+SEED_FILES = {"employee": os.path.join(SPREADSHEET_DIR, "employees.csv"),
+              "product": os.path.join(SPREADSHEET_DIR, "products.csv")}
+TRIPLES_FILE = os.getenv("GRAPH_TRIPLES_FILE", "output_3_triples.json")   # Graph entity names (run_milestone2.py)
+ALIASES_FILE = os.getenv("ALIASES_FILE", "output_4_aliases.json")         # Misspellings/variants -> canonical name
+QUERY_LOG = ROUTER_LOG                 # Questions asked before startup, one JSON decision per line
+QUERY_LOG_MAX_BYTES = 8 * 1024 * 1024  # Only the newest part of the log is read at startup
+MIN_QUERY_SESSIONS = 3                 # A past question is suggested once this many different sessions asked it
+MAX_QUERIES = 2000                     # Most frequent past questions kept in the index
+SOURCE_CHECK_INTERVAL = 5.0            # Seconds between mtime checks of the source files
+MAX_TAIL_WORDS = 3                     # Longest trailing phrase completed as a name ("arjun meh")
+FUZZY_MIN_CHARS = 3
+FUZZY_THRESHOLD = 0.5                  # Share of the typed trigrams a name must contain
+KIND_BOOST = {"employee": 3, "product": 3, "entity": 1, "query": 0}   # Authoritative names rank first
+NAME_KINDS = {"employee", "product", "entity"}
+
+# Past questions that could identify someone are never suggested to others: e-mail addresses,
+# numbers (phone, ids, salaries) and, in build(), employee names
+PRIVATE_PATTERN = re.compile(r"@|\d{3,}")
+
+NON_WORD = re.compile(r"[^\w\s]")
+WORD = re.compile(r"\S+")
+
+
+def normalize(text):
+    return " ".join(NON_WORD.sub(" ", text.lower()).split())
+
+
+def trigrams(key):
+    padded = f" {key}"
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+
+class SuggestData:
+    """
+    One immutable build: a sorted key array searched with bisect (prefix ranges, like an FST
+    without the compression) plus a trigram index over compacted names for misspellings.
+    Keys are the full name, each later word ("mehta" -> "Arjun Mehta"), the name without spaces
+    ("novapay") and the aliases entity resolution recorded.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries            # [{"text", "kind", "weight"}]
+        pairs = []
+        self.blocks = {}
+        self.grams = []
+        for entry_id, entry in enumerate(entries):
+            key = normalize(entry["text"])
+            words = key.split()
+            keys = {(key, "prefix")}
+            if entry["kind"] != "query":
+                keys.add((key.replace(" ", ""), "prefix"))
+                keys.update((" ".join(words[i:]), "word") for i in range(1, len(words)))
+            keys.update((normalize(alias), "alias") for alias in entry.get("aliases", ()))
+            pairs.extend((k, entry_id, match) for k, match in keys if k)
+            grams = trigrams(key.replace(" ", "")) if entry["kind"] != "query" else set()
+            self.grams.append(grams)
+            for gram in grams:
+                self.blocks.setdefault(gram, []).append(entry_id)
+        pairs.sort()
+        self.keys = [p[0] for p in pairs]
+        self.ids = [p[1] for p in pairs]
+        self.matches = [p[2] for p in pairs]
+
+    def prefix(self, prefix, kinds, limit):
+        """(entry id, match) for every key starting with `prefix`, best first."""
+        found = {}
+        position = bisect.bisect_left(self.keys, prefix)
+        while position < len(self.keys) and self.keys[position].startswith(prefix):
+            entry_id = self.ids[position]
+            if self.entries[entry_id]["kind"] in kinds and entry_id not in found:
+                found[entry_id] = self.matches[position]
+            position += 1
+        return self.rank(found, limit)
+
+    def fuzzy(self, typed, limit):
+        grams = trigrams(typed.replace(" ", ""))
+        shared = Counter(entry_id for gram in grams for entry_id in self.blocks.get(gram, ()))
+        found = {entry_id: "fuzzy" for entry_id, overlap in shared.items() if overlap / len(grams) >= FUZZY_THRESHOLD}
+        return self.rank(found, limit, shared)
+
+    def rank(self, found, limit, overlap=None):
+        def score(entry_id):
+            entry = self.entries[entry_id]
+            return (-(overlap or {}).get(entry_id, 0), found[entry_id] == "word", -KIND_BOOST[entry["kind"]],
+                    -entry["weight"], len(entry["text"]))
+        return [(entry_id, found[entry_id]) for entry_id in sorted(found, key=score)[:limit]]
+
+
+class SuggestIndex:
+    """
+    Autocomplete for /api/suggest: canonical employee/product names, graph entities and frequent
+    past questions. Rebuilt in the background when a source file changes (ingestion ran) or a
+    question becomes frequent; lookups keep using the previous build meanwhile.
+    """
+
+    def __init__(self):
+        # Counted in memory from here on; the log is read once
+        self.asked, self.askers = self.logged_questions()
+        self.asked_dirty = False
+        self.lock = threading.Lock()
+        self.rebuilding = False
+        self.signature = self.source_signature()
+        self.last_check = time.monotonic()
+        self.data = self.build()
+
+    def source_signature(self):
+        paths = list(SEED_FILES.values()) + [TRIPLES_FILE, ALIASES_FILE]
+        return tuple(os.path.getmtime(p) if p and os.path.exists(p) else None for p in paths)
+
+    def build(self):
+        start = time.perf_counter()
+        entries = {}   # compact key -> entry; the first source to name an entity decides its kind
+
+        def add(text, kind, weight=1, aliases=()):
+            key = normalize(text).replace(" ", "")
+            if not key:
+                return
+            entry = entries.setdefault(key, {"text": text.strip(), "kind": kind, "weight": 0, "aliases": set()})
+            entry["weight"] += weight
+            entry["aliases"].update(aliases)
+
+        for kind, path in SEED_FILES.items():
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        add(row["name"], kind)
+        if os.path.exists(ALIASES_FILE):
+            with open(ALIASES_FILE, "r", encoding="utf-8") as f:
+                for entity in json.load(f):
+                    add(entity["name"], "entity", entity.get("mentions", 1), entity.get("aliases", ()))
+        if os.path.exists(TRIPLES_FILE):
+            with open(TRIPLES_FILE, "r", encoding="utf-8") as f:
+                for doc in json.load(f):
+                    for head, _, tail in doc.get("triples", []):
+                        add(head, "entity")
+                        add(tail, "entity")
+
+        with self.lock:
+            questions = [(question, count) for question, count in self.asked.most_common()
+                         if len(self.askers.get(question, ())) >= MIN_QUERY_SESSIONS]
+        people = [f" {normalize(entry['text'])} " for entry in entries.values() if entry["kind"] == "employee"]
+        added = 0
+        for question, count in questions:
+            padded = f" {normalize(question)} "
+            if PRIVATE_PATTERN.search(question) or any(name in padded for name in people):
+                continue
+            # Keyed separately: a question that is just a name still completes as the name
+            entries[f"?{normalize(question)}"] = {"text": question.strip(), "kind": "query", "weight": count}
+            added += 1
+            if added == MAX_QUERIES:
+                break
+
+        data = SuggestData(list(entries.values()))
+        print(f"✅ Suggest index: {len(data.entries)} entries, {len(data.keys)} keys "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return data
+
+    @staticmethod
+    def logged_questions():
+        """(times each question was asked, session tags that asked it) from the router log."""
+        counts, askers = Counter(), {}
+        if QUERY_LOG and os.path.exists(QUERY_LOG):
+            with open(QUERY_LOG, "rb") as f:
+                skip = max(0, os.path.getsize(QUERY_LOG) - QUERY_LOG_MAX_BYTES)
+                f.seek(skip)
+                if skip:
+                    f.readline()   # Partial line
+                for line in f:
+                    try:
+                        decision = json.loads(line)
+                        question = decision["query"].strip()
+                    except (ValueError, KeyError, AttributeError):
+                        continue
+                    counts[question] += 1
+                    if decision.get("session"):
+                        tags = askers.setdefault(question, set())
+                        if len(tags) < MIN_QUERY_SESSIONS:
+                            tags.add(decision["session"])
+        return counts, askers
+
+    def record(self, query, session_id=None):
+        # Asks without a session (CLI, batch) add weight but can't show that several people ask it
+        question = query.strip()
+        with self.lock:
+            self.asked[question] += 1
+            tags = self.askers.setdefault(question, set())
+            if session_id and len(tags) < MIN_QUERY_SESSIONS:
+                tags.add(session_tag(session_id))
+                self.asked_dirty = self.asked_dirty or len(tags) == MIN_QUERY_SESSIONS
+
+    def maybe_rebuild(self):
+        now = time.monotonic()
+        if now - self.last_check < SOURCE_CHECK_INTERVAL or self.rebuilding:
+            return
+        self.last_check = now
+        signature = self.source_signature()
+        if signature == self.signature and not self.asked_dirty:
+            return
+        self.signature, self.asked_dirty, self.rebuilding = signature, False, True
+
+        def rebuild():
+            try:
+                self.data = self.build()
+            except Exception as e:
+                print(f"⚠️ Suggest index rebuild failed, keeping the previous one: {e}")
+            finally:
+                self.rebuilding = False
+
+        threading.Thread(target=rebuild, daemon=True, name="suggest-rebuild").start()
+
+    def suggest(self, text, limit=8):
+        """
+        Completions for what has been typed so far, past questions first (they match all of it).
+        Each has `start`, the offset in `text` its completion replaces: 0 for a whole past question,
+        the start of the name being typed otherwise.
+        """
+        self.maybe_rebuild()
+        data = self.data
+        words = list(WORD.finditer(text))
+        if not words:
+            return []
+        results = []
+        seen = set()
+
+        def take(matches, start):
+            for entry_id, match in matches:
+                entry = data.entries[entry_id]
+                if entry["text"].lower() not in seen and len(results) < limit:
+                    seen.add(entry["text"].lower())
+                    results.append({"text": entry["text"], "kind": entry["kind"], "match": match, "start": start})
+
+        take(data.prefix(normalize(text), {"query"}, limit), 0)
+        # Longest trailing phrase that is the start of a name: "who manages arjun meh" -> "arjun meh"
+        for size in range(min(MAX_TAIL_WORDS, len(words)), 0, -1):
+            start = words[-size].start()
+            typed = normalize(text[start:])
+            # "nova pay" completes "NovaPay" through its space-free key
+            matches = data.prefix(typed, NAME_KINDS, limit) or data.prefix(typed.replace(" ", ""), NAME_KINDS, limit)
+            if matches:
+                take(matches, start)
+                break
+        if not results:
+            tail = normalize(words[-1].group())
+            if len(tail) >= FUZZY_MIN_CHARS:
+                take(data.fuzzy(tail, limit), words[-1].start())
+        return results
+
+    def summary(self):
+        data = self.data
+        return {"entries": len(data.entries), "keys": len(data.keys),
+                "kinds": dict(Counter(entry["kind"] for entry in data.entries))}
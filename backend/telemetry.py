@@ -0,0 +1,175 @@
+import time
+import contextvars
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- PROMETHEUS METRICS (served by GET /metrics in main.py) ---
+STAGE_LATENCY = Histogram(
+    "rag_stage_latency_seconds",
+    "Latency of each HybridRAG stage",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+STAGE_ERRORS = Counter("rag_stage_errors_total", "Errors raised per stage", ["stage"])
+CACHE_REQUESTS = Counter("rag_cache_requests_total", "Cache lookups by result (hit/miss)", ["cache", "result"])
+CACHE_SAVED_SECONDS = Counter("rag_cache_saved_seconds_total", "Backend time avoided by cache hits", ["cache"])
+QUEUE_DEPTH = Gauge("rag_queue_depth", "Work currently waiting or running", ["queue"])
+ADMISSION_REJECTED = Counter("rag_admission_rejected_total", "Requests shed by admission control",
+                             ["priority", "reason"])
+ROUTE_DECISIONS = Counter("rag_route_decisions_total", "Backends the query router chose to consult", ["route"])
+VECTOR_SHARD_MISSES = Counter("rag_vector_shard_misses_total", "Vector shards left out of a search",
+                              ["shard", "reason"])
+CYPHER_REWRITES = Counter("rag_cypher_fulltext_rewrites_total",
+                          "Generated Cypher served through the full-text name index", ["result"])
+LLM_TOKENS = Counter("rag_llm_tokens_total", "LLM tokens reported by the provider", ["kind"])
+
+# The trace of the request running in the current thread/task (None outside a request)
+_current_trace = contextvars.ContextVar("rag_trace", default=None)
+
+
+class Trace:
+    """Per-request stage timings and real token counts, returned in the response `metrics`."""
+
+    def __init__(self):
+        self.stages = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add_stage(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_tokens(self, prompt_tokens, completion_tokens):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+    def breakdown_ms(self):
+        return {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()}
+
+
+@contextmanager
+def trace():
+    """Starts a new Trace for the current request."""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def record_stage(stage, seconds):
+    STAGE_LATENCY.labels(stage).observe(seconds)
+    current = _current_trace.get()
+    if current is not None:
+        current.add_stage(stage, seconds)
+
+
+def record_error(stage):
+    STAGE_ERRORS.labels(stage).inc()
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_cache_saving(cache, seconds):
+    CACHE_SAVED_SECONDS.labels(cache).inc(seconds)
+
+
+def record_rejection(priority, reason):
+    ADMISSION_REJECTED.labels(priority, reason).inc()
+
+
+def record_route(route):
+    ROUTE_DECISIONS.labels(route).inc()
+
+
+def record_shard_miss(shard, reason):
+    VECTOR_SHARD_MISSES.labels(shard, reason).inc()
+
+
+def record_cypher_rewrite(result):
+    CYPHER_REWRITES.labels(result).inc()
+
+
+@contextmanager
+def span(stage):
+    """Times a block as `stage`; exceptions are counted as stage errors and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        record_error(stage)
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def queued(queue):
+    QUEUE_DEPTH.labels(queue).inc()
+    try:
+        yield
+    finally:
+        QUEUE_DEPTH.labels(queue).dec()
+
+
+def _usage_from_result(response):
+    # Prefer the message's usage_metadata, fall back to the provider's raw token_usage
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    token_usage = (response.llm_output or {}).get("token_usage", {})
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+class LLMStageCallback(BaseCallbackHandler):
+    """
+    Times each LLM call inside a chain and names it after the chain's stages, in order
+    (e.g. the graph chain's two calls become "cypher_generation" then "graph_qa").
+    """
+
+    def __init__(self, stages, request_trace):
+        self.stages = list(stages)
+        self.request_trace = request_trace
+        self.started = {}
+        self.calls = 0
+
+    def _start(self, run_id):
+        self.started[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def _stage_name(self):
+        stage = self.stages[self.calls] if self.calls < len(self.stages) else f"{self.stages[-1]}_{self.calls}"
+        self.calls += 1
+        return stage
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self.started.pop(run_id, None)
+        stage = self._stage_name()
+        seconds = time.perf_counter() - start if start else 0.0
+        prompt_tokens, completion_tokens = _usage_from_result(response)
+
+        # Callbacks can fire outside the request's context, so write to the captured trace
+        STAGE_LATENCY.labels(stage).observe(seconds)
+        LLM_TOKENS.labels("prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels("completion").inc(completion_tokens)
+        if self.request_trace is not None:
+            self.request_trace.add_stage(stage, seconds)
+            self.request_trace.add_tokens(prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.started.pop(run_id, None)
+        record_error(self._stage_name())
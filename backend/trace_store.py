@@ -0,0 +1,59 @@
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+# --- CONFIGURATION ---
+MAX_TRACES = 2000                   # Least recently stored traces are dropped beyond this
+MAX_TRACE_BYTES = 64 * 1024 * 1024  # Approximate, measured on the JSON form of each trace
+TRACE_TTL = 30 * 60                 # Same lifetime as a chat session
+
+
+class TraceStore:
+    """
+    Reasoning traces (the retrieved graph/vector/structured context behind an answer), kept
+    server-side so chat responses only carry a trace id. Bounded by count, size and age.
+    """
+
+    def __init__(self, max_traces=MAX_TRACES, max_bytes=MAX_TRACE_BYTES, ttl=TRACE_TTL):
+        self.max_traces = max_traces
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.traces = OrderedDict()   # trace id -> (created, size, trace)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def put(self, query, thoughts):
+        trace_id = uuid.uuid4().hex
+        trace = {"trace_id": trace_id, "query": query, "thoughts": thoughts}
+        size = len(json.dumps(trace, ensure_ascii=False, default=str))
+        now = time.monotonic()
+        with self.lock:
+            self.traces[trace_id] = (now, size, trace)
+            self.total_bytes += size
+            self._evict(now)
+        return trace_id
+
+    def get(self, trace_id):
+        with self.lock:
+            self._evict(time.monotonic())
+            entry = self.traces.get(trace_id)
+            return entry[2] if entry else None
+
+    def _evict(self, now):
+        # Oldest first: expired traces, then whatever exceeds the count/size bounds
+        while self.traces:
+            created, size, _ = next(iter(self.traces.values()))
+            if now - created < self.ttl and len(self.traces) <= self.max_traces \
+                    and self.total_bytes <= self.max_bytes:
+                break
+            self.traces.popitem(last=False)
+            self.total_bytes -= size
+
+    def summary(self):
+        with self.lock:
+            return {"traces": len(self.traces), "bytes": self.total_bytes}
+
+    def __len__(self):
+        return len(self.traces)
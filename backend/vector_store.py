@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import time
+import zlib
+import heapq
+import queue
+import atexit
+import argparse
+import socket
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait
+from multiprocessing.connection import Client, Listener
+import numpy as np
+import faiss
+import telemetry
+from admission import MAX_IN_FLIGHT, current_request
+
+# --- CONFIGURATION ---
+SHARD_DIR = os.getenv("VECTOR_SHARD_DIR", "vector_shards")
+SHARD_MANIFEST = "manifest.json"
+SHARD_MODE = os.getenv("VECTOR_SHARD_MODE", "thread")       # thread = shards in this process, process = one server each
+SHARD_ADDRESSES = os.getenv("VECTOR_SHARD_ADDRESSES", "")   # "host:port,..." of shard servers started elsewhere
+# 0 = any free port (two index builds' servers run side by side while a new build is swapped in)
+SHARD_BASE_PORT = int(os.getenv("VECTOR_SHARD_BASE_PORT", "0"))
+# Shard RPC unpickles what it receives, so the key is the only thing keeping other local users out.
+# Servers started by ShardedIndex get a random one; servers run by hand (and VECTOR_SHARD_ADDRESSES) need this set.
+SHARD_AUTHKEY = os.getenv("VECTOR_SHARD_AUTHKEY", "").encode()
+SHARD_DEADLINE = float(os.getenv("VECTOR_SHARD_DEADLINE", "0.5"))   # Seconds; later shards are left out of the answer
+SHARD_STARTUP_TIMEOUT = 60
+# Searches running at once; the shared pool gets a thread per shard for each, so no shard task queues
+# behind another request's and misses its deadline waiting for a thread
+SHARD_SEARCH_CONCURRENCY = int(os.getenv("VECTOR_SHARD_CONCURRENCY", str(MAX_IN_FLIGHT)))
+PARTITIONS = ("source", "hash")
+
+# Same padding faiss uses for "no result"
+EMPTY_DISTANCE = np.finfo("float32").max
+
+
+def shard_of(record, row, shards, partition="source"):
+    # "source" keeps every chunk of a document on one shard; "hash" spreads chunks evenly
+    key = str(row) if partition == "hash" else (record.get("file_name") or record.get("source", ""))
+    return zlib.crc32(key.encode("utf-8")) % shards
+
+
+def write_shards(embeddings, metadata, shards, partition="source", shard_dir=SHARD_DIR):
+    """
+    Splits the embedding matrix into `shards` flat L2 indexes. Each shard keeps the global row
+    ids (IndexIDMap), so search results still index faiss_metadata.json directly.
+    """
+    if partition not in PARTITIONS:
+        raise ValueError(f"Unknown partition '{partition}', expected one of {PARTITIONS}")
+    embeddings = np.asarray(embeddings, dtype="float32")
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_path = os.path.join(shard_dir, SHARD_MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)   # Readers never see a mix of old and new shard files
+
+    assignment = np.array([shard_of(m, row, shards, partition) for row, m in enumerate(metadata)], dtype=np.int64)
+    files = []
+    for shard in range(shards):
+        ids = np.flatnonzero(assignment == shard).astype(np.int64)
+        index = faiss.IndexIDMap(faiss.IndexFlatL2(embeddings.shape[1]))
+        if len(ids):
+            index.add_with_ids(embeddings[ids], ids)
+        name = f"shard_{shard:03d}.faiss"
+        faiss.write_index(index, os.path.join(shard_dir, name))
+        files.append({"file": name, "count": int(len(ids))})
+
+    manifest = {"shards": shards, "partition": partition, "dimension": int(embeddings.shape[1]),
+                "ntotal": int(len(embeddings)), "files": files}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+
+def search_params(ids):
+    """faiss search parameters that only score the given row ids (None = every row)."""
+    if ids is None:
+        return None
+    return faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.asarray(ids, dtype=np.int64)))
+
+
+def search(index, vectors, k, ids=None):
+    """index.search for a single-file index or a ShardedIndex, optionally restricted to `ids`."""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    if isinstance(index, ShardedIndex):
+        return index.search(vectors, k, ids=ids)
+    if ids is None:
+        return index.search(vectors, k)
+    return index.search(vectors, k, params=search_params(ids))
+
+
+def merge_topk(results, query_count, k):
+    """Heap-merges per-shard (distances, ids) into one global top-k per query row."""
+    distances = np.full((query_count, k), EMPTY_DISTANCE, dtype="float32")
+    indices = np.full((query_count, k), -1, dtype=np.int64)
+    for row in range(query_count):
+        candidates = ((d, i) for shard_d, shard_i in results
+                      for d, i in zip(shard_d[row], shard_i[row]) if i != -1)
+        for rank, (d, i) in enumerate(heapq.nsmallest(k, candidates)):
+            distances[row, rank] = d
+            indices[row, rank] = i
+    return distances, indices
+
+
+class LocalShard:
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        self.index = faiss.read_index(path)
+
+    def search(self, vectors, k, timeout, ids=None):
+        if ids is None:
+            return self.index.search(vectors, k)
+        return self.index.search(vectors, k, params=search_params(ids))
+
+    def close(self):
+        pass
+
+
+class RemoteShard:
+    """Client for one shard server; keeps a small pool of open connections."""
+
+    def __init__(self, address, authkey):
+        self.name = f"{address[0]}:{address[1]}"
+        self.address = address
+        self.authkey = authkey
+        self.connections = queue.LifoQueue()
+
+    def search(self, vectors, k, timeout, ids=None):
+        try:
+            connection = self.connections.get_nowait()
+        except queue.Empty:
+            connection = Client(self.address, authkey=self.authkey)
+        try:
+            connection.send(("search", vectors, k, ids))
+            if not connection.poll(timeout):
+                raise TimeoutError(f"shard {self.name} did not answer within {timeout:.2f}s")
+            result = connection.recv()
+        except Exception:
+            # A late answer would arrive on the next request; never reuse this connection
+            connection.close()
+            raise
+        self.connections.put(connection)
+        return result
+
+    def close(self):
+        while not self.connections.empty():
+            self.connections.get_nowait().close()
+
+
+def free_port(host="127.0.0.1"):
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def parse_addresses(addresses):
+    parsed = []
+    for item in filter(None, (a.strip() for a in addresses.split(","))):
+        host, port = item.rsplit(":", 1)
+        parsed.append((host, int(port)))
+    return parsed
+
+
+class ShardedIndex:
+    """
+    Vector search over N shards behind the faiss `search(vectors, k)` interface.
+    Shards are searched in parallel (threads over in-process indexes, or shard server processes
+    over a local RPC); per-shard top-k lists are heap-merged. A shard that fails or misses the
+    deadline is left out of that answer and counted, instead of holding up the request.
+    """
+
+    def __init__(self, shard_dir=SHARD_DIR, mode=SHARD_MODE, addresses=SHARD_ADDRESSES, deadline=SHARD_DEADLINE):
+        with open(os.path.join(shard_dir, SHARD_MANIFEST), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.ntotal = self.manifest["ntotal"]
+        self.d = self.manifest["dimension"]
+        self.deadline = deadline
+        self.processes = []
+        paths = [os.path.join(shard_dir, entry["file"]) for entry in self.manifest["files"]]
+
+        if mode == "process":
+            remote = parse_addresses(addresses)
+            if remote and not SHARD_AUTHKEY:
+                raise ValueError("VECTOR_SHARD_ADDRESSES needs the servers' VECTOR_SHARD_AUTHKEY")
+            authkey = SHARD_AUTHKEY
+            if not remote:
+                authkey = os.urandom(32).hex().encode()
+                remote = self.start_servers(paths, authkey)
+            self.shards = [RemoteShard(address, authkey) for address in remote]
+        else:
+            self.shards = [LocalShard(path) for path in paths]
+        self.pool = ThreadPoolExecutor(max_workers=len(self.shards) * SHARD_SEARCH_CONCURRENCY,
+                                       thread_name_prefix="vector-shard")
+        atexit.register(self.close)
+
+    def start_servers(self, paths, authkey):
+        addresses = [("127.0.0.1", SHARD_BASE_PORT + n if SHARD_BASE_PORT else free_port()) for n in range(len(paths))]
+        # The key goes through the environment, not argv, which every local user can read
+        env = dict(os.environ, VECTOR_SHARD_AUTHKEY=authkey.decode())
+        for path, (_, port) in zip(paths, addresses):
+            self.processes.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "serve", path, "--port", str(port)], env=env))
+        # Wait until every server accepts connections (loading a large shard takes a while)
+        give_up = time.monotonic() + SHARD_STARTUP_TIMEOUT
+        for address in addresses:
+            while True:
+                try:
+                    Client(address, authkey=authkey).close()
+                    break
+                except OSError:
+                    if time.monotonic() > give_up:
+                        print(f"⚠️ Shard server {address[0]}:{address[1]} did not start; it will be reported missing")
+                        break
+                    time.sleep(0.1)
+        return addresses
+
+    def search(self, vectors, k, ids=None):
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        budget = self.deadline
+        request = current_request()
+        if request is not None:
+            budget = max(0.0, min(budget, request.remaining()))
+
+        futures = {self.pool.submit(shard.search, vectors, k, budget, ids): shard for shard in self.shards}
+        done, late = wait(futures, timeout=budget)
+        results = []
+        for future in done:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"⚠️ Vector shard {futures[future].name} failed: {e}")
+                telemetry.record_shard_miss(futures[future].name, "error")
+        for future in late:
+            telemetry.record_shard_miss(futures[future].name, "timeout")
+        return merge_topk(results, len(vectors), k)
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        for shard in self.shards:
+            shard.close()
+        for process in self.processes:
+            process.terminate()
+        self.processes = []
+
+
+def open_index(index_file, shard_dir=SHARD_DIR):
+    """The sharded store if the embedding pipeline wrote one, else the single-file index."""
+    if os.path.exists(os.path.join(shard_dir, SHARD_MANIFEST)):
+        index = ShardedIndex(shard_dir)
+        print(f"✅ Sharded Vector Store: {len(index.shards)} shards, {index.ntotal} vectors ({SHARD_MODE})")
+        return index
+    if not os.path.exists(index_file):
+        raise FileNotFoundError("Vector store missing!")
+    return faiss.read_index(index_file)
+
+
+def serve(path, port, host="127.0.0.1"):
+    """One shard server: loads a single shard and answers ("search", vectors, k, ids) messages."""
+    if not SHARD_AUTHKEY:
+        raise SystemExit("VECTOR_SHARD_AUTHKEY must be set; clients with the key can run code in this process")
+    index = faiss.read_index(path)
+    print(f"Shard {os.path.basename(path)}: {index.ntotal} vectors on {host}:{port}")
+
+    def handle(connection):
+        with connection:
+            while True:
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    return
+                if message[0] == "search":
+                    _, vectors, k, ids = message
+                    connection.send(index.search(vectors, k, params=search_params(ids)) if ids is not None
+                                    else index.search(vectors, k))
+                elif message[0] == "ping":
+                    connection.send(index.ntotal)
+
+    with Listener((host, port), authkey=SHARD_AUTHKEY) as listener:
+        while True:
+            connection = listener.accept()
+            threading.Thread(target=handle, args=(connection,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector shard server")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="Serve one shard file over a local RPC")
+    serve_parser.add_argument("path")
+    serve_parser.add_argument("--port", type=int, required=True)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+    serve(args.path, args.port, args.host)
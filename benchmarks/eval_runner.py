@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT, "backend")
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION ---
+DEFAULT_QUESTIONS = os.path.join(BENCH_DIR, "eval_questions.json")
+DEFAULT_CASSETTE = os.path.join(BENCH_DIR, "eval_llm_cassette.json")
+DEFAULT_OUTPUT = "eval_report.json"
+QUALITY_TOLERANCE = 0.05   # Absolute drop in recall/MRR/accuracy that counts as a regression
+LATENCY_TOLERANCE = 0.20   # Relative p95 increase per stage that counts as a regression
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return round(ordered[rank], 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def load_bot(args):
+    # Paths in hybrid_rag2 are relative to backend/, and its config is read from env at import
+    if args.graph:
+        os.environ["GRAPH_BACKEND"] = args.graph
+    if args.llm == "replay":
+        # Nothing upstream to protect; don't let the gateway's Groq quota pace a local replay
+        os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "100000")
+        os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "100000000")
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    from hybrid_rag2 import HybridRAG
+
+    model = None
+    if args.llm != "live":
+        from replay_llm import ReplayChatModel
+        upstream = None
+        if args.llm == "record":
+            from llm_gateway import LLMGateway
+            upstream = LLMGateway().llm
+        model = ReplayChatModel(cassette_path=args.cassette, mode=args.llm, upstream=upstream)
+    return HybridRAG(llm=model), model
+
+
+def retrieved_files(bot, indices):
+    files = []
+    for idx in indices:
+        for citation in bot.citations([idx]):
+            if citation["file"] not in files:
+                files.append(citation["file"])
+    return files
+
+
+def evaluate_retrieval(bot, items, k):
+    """Retrieval on its own: one batched encode + one matrix search, no LLM involved."""
+    vectors = bot.embedder.encode([item["question"] for item in items], batch_size=64)
+    _, indices = bot.search_vectors(vectors, k)
+    results = []
+    for item, row in zip(items, indices):
+        files = retrieved_files(bot, [int(i) for i in row if i != -1])
+        expected = set(item.get("expected_sources", []))
+        hits = [f for f in files if f in expected]
+        rank = next((i + 1 for i, f in enumerate(files) if f in expected), None)
+        results.append({
+            "retrieved": files,
+            "recall": len(set(hits)) / len(expected) if expected else None,
+            "reciprocal_rank": 1.0 / rank if rank else 0.0,
+        })
+    return results
+
+
+def evaluate_answer(bot, item):
+    start = time.perf_counter()
+    try:
+        response = bot.ask(item["question"])
+    except Exception as e:
+        return {"error": str(e), "latency_ms": (time.perf_counter() - start) * 1000}
+    answer = response["answer"]
+    keywords = item.get("answer_keywords", [])
+    found = [kw for kw in keywords if kw.lower() in answer.lower()]
+    return {
+        "answer": answer,
+        "keyword_recall": len(found) / len(keywords) if keywords else None,
+        "correct": len(found) == len(keywords),
+        "missing_keywords": [kw for kw in keywords if kw not in found],
+        "stages_ms": response["metrics"].get("stages_ms", {}),
+        "skipped_stages": response["metrics"].get("skipped_stages", []),
+        "latency_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def mean(values):
+    values = [v for v in values if v is not None]
+    return round(sum(values) / len(values), 4) if values else None
+
+
+def summarize(items, retrieval, answers, args, llm_stats):
+    stage_samples = {"end_to_end": [a["latency_ms"] for a in answers]}
+    for a in answers:
+        for stage, ms in a.get("stages_ms", {}).items():
+            stage_samples.setdefault(stage, []).append(ms)
+
+    questions = []
+    for item, r, a in zip(items, retrieval, answers):
+        questions.append(dict(id=item.get("id"), question=item["question"],
+                              expected_sources=item.get("expected_sources", []), **r, **a))
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"k": args.k, "concurrency": args.concurrency, "llm": args.llm,
+                   "graph": os.getenv("GRAPH_BACKEND", "neo4j"), "questions_file": os.path.basename(args.questions)},
+        "summary": {
+            "questions": len(items),
+            "errors": sum(1 for a in answers if "error" in a),
+            f"recall_at_{args.k}": mean(r["recall"] for r in retrieval),
+            "mrr": mean(r["reciprocal_rank"] for r in retrieval),
+            "keyword_recall": mean(a.get("keyword_recall") for a in answers),
+            "answer_accuracy": mean(1.0 if a.get("correct") else 0.0 for a in answers),
+        },
+        "latency_ms": {stage: {"p50": percentile(v, 50), "p95": percentile(v, 95), "n": len(v)}
+                       for stage, v in sorted(stage_samples.items())},
+        "llm_replay": llm_stats,
+        "questions": questions,
+    }
+
+
+def to_markdown(report):
+    lines = [f"# Evaluation report ({report['commit']}, {report['timestamp']})", "",
+             "| Setting | Value |", "|---|---|"]
+    lines += [f"| {key} | {value} |" for key, value in report["config"].items()]
+    lines += ["", "| Metric | Value |", "|---|---|"]
+    lines += [f"| {key} | {value} |" for key, value in report["summary"].items()]
+    lines += ["", "| Stage | p50 ms | p95 ms | n |", "|---|---|---|---|"]
+    lines += [f"| {stage} | {v['p50']} | {v['p95']} | {v['n']} |" for stage, v in report["latency_ms"].items()]
+    lines += ["", "| Id | Recall | RR | Keywords | Retrieved |", "|---|---|---|---|---|"]
+    for q in report["questions"]:
+        lines.append(f"| {q['id']} | {q['recall']} | {round(q['reciprocal_rank'], 2)} | "
+                     f"{q.get('keyword_recall', 'error')} | {', '.join(q['retrieved'])} |")
+    return "\n".join(lines) + "\n"
+
+
+def compare(report, baseline_file):
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n--- Compared with {baseline_file} ({baseline.get('commit')}) ---")
+    regressions = []
+    for key, new in report["summary"].items():
+        old = baseline["summary"].get(key)
+        if not isinstance(new, float) or not isinstance(old, float):
+            continue
+        flag = ""
+        if new < old - QUALITY_TOLERANCE:
+            flag = "  <-- REGRESSION"
+            regressions.append(key)
+        print(f"  {key:<28} {old:>8} -> {new:<8}{flag}")
+    for stage, values in report["latency_ms"].items():
+        old = baseline.get("latency_ms", {}).get(stage, {}).get("p95")
+        new = values["p95"]
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        flag = ""
+        if change > LATENCY_TOLERANCE:
+            flag = "  <-- REGRESSION"
+            regressions.append(f"{stage}.p95")
+        print(f"  {stage + '.p95':<28} {old:>8} -> {new:<8} {change:+.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Labeled evaluation of retrieval quality, answers and stage latency")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="JSON list of {id, question, expected_sources, answer_keywords}")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm", choices=["replay", "record", "live"], default="replay",
+                        help="replay = deterministic, offline; record = call Groq and save responses")
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--graph", choices=["neo4j", "embedded", "fake", "none"], help="Overrides GRAPH_BACKEND")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--markdown", help="Also write a Markdown report here")
+    parser.add_argument("--compare", help="Previous eval_report.json to check for regressions")
+    args = parser.parse_args()
+
+    # Resolve output paths before load_bot() switches into backend/
+    args.questions, args.cassette, args.output = map(os.path.abspath, (args.questions, args.cassette, args.output))
+    args.markdown = os.path.abspath(args.markdown) if args.markdown else None
+    args.compare = os.path.abspath(args.compare) if args.compare else None
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    bot, model = load_bot(args)
+
+    print(f"--- EVALUATING {len(items)} questions (k={args.k}, concurrency={args.concurrency}, llm={args.llm}) ---")
+    retrieval = evaluate_retrieval(bot, items, args.k)
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        answers = list(pool.map(lambda item: evaluate_answer(bot, item), items))
+
+    if model is not None and args.llm == "record":
+        model.save()
+    report = summarize(items, retrieval, answers, args, model.stats() if model else None)
+    print(json.dumps(report["summary"], indent=4))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Report saved to: {args.output}")
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(to_markdown(report))
+        print(f"Markdown saved to: {args.markdown}")
+
+    if args.compare:
+        regressions = compare(report, args.compare)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT, "backend")
+
+# --- CONFIGURATION ---
+SERVER_PORT = 8765
+FAKE_LLM_PORT = 9100
+BOOT_TIMEOUT = 180   # The server loads the FAISS index and the embedding model on boot
+DEFAULT_QUESTIONS = [
+    "Who is the CEO?",
+    "Summarize the leave policy.",
+    "Which stock exchange is Infosys listed on?",
+    "What is NovaPay?",
+    "Which department does Arjun Mehta work in?",
+    "What issues were reported for SecureID?",
+    "Who owns the largest project budget?",
+    "What certifications like ISO9001 are mentioned?",
+    "Summarize the ESG report.",
+    "What benefits are described in the 2021-2022 benefit guide?",
+    "What does the COO employment agreement say about termination?",
+    "Which customers reported authentication failures?",
+    "What is Insight360 used for?",
+    "Who is assigned to open MarketSense tickets?",
+    "What are the customer service guidelines?",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return round(ordered[rank] * 1000, 1)
+
+
+def load_questions(path):
+    if not path:
+        return DEFAULT_QUESTIONS
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class Harness:
+    """Starts the fake LLM and backend/main.py as subprocesses, wired together through env vars."""
+
+    def __init__(self, args):
+        self.args = args
+        self.processes = []
+
+    def start(self):
+        python = sys.executable
+        self.processes.append(subprocess.Popen(
+            [python, "fake_llm_server.py", "--port", str(FAKE_LLM_PORT),
+             "--latency", str(self.args.llm_latency),
+             "--tokens-per-second", str(self.args.llm_tokens_per_second),
+             "--completion-tokens", str(self.args.llm_completion_tokens)],
+            cwd=BACKEND_DIR,
+        ))
+        env = dict(os.environ)
+        env.update({
+            "GROQ_API_BASE": f"http://127.0.0.1:{FAKE_LLM_PORT}",
+            "GROQ_API_KEY": env.get("GROQ_API_KEY") or "fake",
+            "GRAPH_BACKEND": self.args.graph,
+            "FAKE_GRAPH_LATENCY": str(self.args.graph_latency),
+            # The fake has no quota; let the server's own limits be the bottleneck under test
+            "LLM_REQUESTS_PER_MINUTE": env.get("LLM_REQUESTS_PER_MINUTE", "100000"),
+            "LLM_TOKENS_PER_MINUTE": env.get("LLM_TOKENS_PER_MINUTE", "100000000"),
+        })
+        self.processes.append(subprocess.Popen(
+            [python, "-m", "uvicorn", "main:app", "--port", str(SERVER_PORT), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env,
+        ))
+        self.wait_until_ready(f"http://127.0.0.1:{SERVER_PORT}")
+
+    def wait_until_ready(self, base_url):
+        deadline = time.time() + BOOT_TIMEOUT
+        while time.time() < deadline:
+            if self.processes[-1].poll() is not None:
+                raise RuntimeError("Backend exited during boot (has the embedding pipeline published an index build in backend/indexes/?)")
+            try:
+                if httpx.get(f"{base_url}/metrics", timeout=2).status_code == 200:
+                    print("✅ Backend ready")
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(1)
+        raise RuntimeError("Backend did not become ready in time")
+
+    def stop(self):
+        for process in reversed(self.processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def send_one(client, url, question, samples):
+    start = time.perf_counter()
+    ttfb = None
+    try:
+        async with client.stream("POST", url, json={"query": question}) as response:
+            async for _ in response.aiter_bytes():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+            status = response.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    samples.append({"status": status, "latency": time.perf_counter() - start, "ttfb": ttfb})
+
+
+async def closed_loop(client, url, questions, concurrency, duration, samples):
+    # N virtual users, each sending its next question as soon as the previous answer arrives
+    deadline = time.perf_counter() + duration
+
+    async def user(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            await send_one(client, url, rng.choice(questions), samples)
+
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+
+
+async def open_loop(client, url, questions, rate, duration, samples):
+    # Poisson arrivals at a fixed rate, independent of how fast the server answers
+    rng = random.Random(0)
+    deadline = time.perf_counter() + duration
+    tasks = []
+    while time.perf_counter() < deadline:
+        tasks.append(asyncio.create_task(send_one(client, url, rng.choice(questions), samples)))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+
+
+def summarize(samples, elapsed, args):
+    ok = [s for s in samples if s["status"] == 200]
+    statuses = {}
+    for s in samples:
+        statuses[str(s["status"])] = statuses.get(str(s["status"]), 0) + 1
+    latencies = [s["latency"] for s in ok]
+    ttfbs = [s["ttfb"] for s in ok if s["ttfb"] is not None]
+    return {
+        "mode": "open" if args.rate else "closed",
+        "concurrency": None if args.rate else args.concurrency,
+        "rate": args.rate,
+        "duration_s": round(elapsed, 1),
+        "requests": len(samples),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0,
+        "error_rate": round(1 - len(ok) / len(samples), 4) if samples else 0,
+        "status_codes": statuses,
+        "latency_ms": {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99)},
+        "ttfb_ms": {"p50": percentile(ttfbs, 50), "p95": percentile(ttfbs, 95), "p99": percentile(ttfbs, 99)},
+        "setup": {"llm_latency": args.llm_latency, "llm_tokens_per_second": args.llm_tokens_per_second,
+                  "graph": args.graph, "graph_latency": args.graph_latency},
+    }
+
+
+def compare(report, baseline_file):
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n--- Compared with {baseline_file} ---")
+    rows = [("throughput_rps", report["throughput_rps"], baseline["throughput_rps"]),
+            ("error_rate", report["error_rate"], baseline["error_rate"])]
+    for group in ("latency_ms", "ttfb_ms"):
+        for pct in ("p50", "p95", "p99"):
+            rows.append((f"{group}.{pct}", report[group][pct], baseline[group][pct]))
+    for name, new, old in rows:
+        change = f"{(new - old) / old:+.1%}" if new is not None and old else "n/a"
+        print(f"  {name:<16} {old!s:>10} -> {new!s:<10} {change}")
+
+
+async def run_load(args, questions):
+    url = f"{args.url.rstrip('/')}/api/chat"
+    samples = []
+    limits = httpx.Limits(max_connections=max(args.concurrency, 100))
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        if args.rate:
+            await open_loop(client, url, questions, args.rate, args.duration, samples)
+        else:
+            await closed_loop(client, url, questions, args.concurrency, args.duration, samples)
+        return samples, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for /api/chat with fake LLM/graph backends")
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop virtual users")
+    parser.add_argument("--rate", type=float, help="Open-loop arrival rate (req/s); overrides --concurrency")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--questions", help="File with one question per line")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=250)
+    parser.add_argument("--llm-completion-tokens", type=int, default=120)
+    parser.add_argument("--graph", choices=["fake", "embedded", "none", "neo4j"], default="fake")
+    parser.add_argument("--graph-latency", type=float, default=0.05)
+    parser.add_argument("--output", default="load_results.json")
+    parser.add_argument("--save-baseline", help="Also write the results here for later --compare runs")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    args = parser.parse_args()
+
+    harness = None
+    if not args.url:
+        harness = Harness(args)
+        harness.start()
+        args.url = f"http://127.0.0.1:{SERVER_PORT}"
+
+    try:
+        mode = f"open loop @ {args.rate} req/s" if args.rate else f"closed loop x{args.concurrency}"
+        print(f"--- LOAD TEST: {mode} for {args.duration}s against {args.url} ---")
+        samples, elapsed = asyncio.run(run_load(args, load_questions(args.questions)))
+    finally:
+        if harness:
+            harness.stop()
+
+    report = summarize(samples, elapsed, args)
+    print(json.dumps(report, indent=4))
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
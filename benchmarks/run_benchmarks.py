@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+
+# Offline runs only: never try to download models from the Hub
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "data_ingestion"))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_corpus import generate_corpus
+
+# --- CONFIGURATION ---
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+DEFAULT_OUTPUT = "bench_results.json"
+NER_SAMPLE = 300        # spaCy is the slowest component; time it on a fixed slice
+EMBED_SAMPLE = 512
+SEARCH_QUERIES = 200
+TOP_K = 3
+SHARDS = 4
+
+
+def measure(name, func, items, repeat):
+    """Runs func `repeat` times and reports the median (robust to a noisy first run)."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    result = {
+        "name": name,
+        "items": items,
+        "repeat": repeat,
+        "median_s": round(median, 6),
+        "min_s": round(min(timings), 6),
+        "items_per_s": round(items / median, 1) if median > 0 else None,
+    }
+    print(f"  {name:<28} {median * 1000:>10.2f} ms  ({result['items_per_s']} items/s)")
+    return result
+
+
+def skipped(name, reason):
+    print(f"  {name:<28} SKIPPED ({reason})")
+    return {"name": name, "skipped": reason}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def bench_chunking(documents, repeat):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    ingestion_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    embedding_splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
+    texts = [d["content"] for d in documents]
+
+    results = [measure("chunking_1000_200", lambda: [ingestion_splitter.split_text(t) for t in texts],
+                       len(texts), repeat)]
+    first_pass = [c for t in texts for c in ingestion_splitter.split_text(t)]
+    results.append(measure("chunking_800_100_second_pass",
+                           lambda: [embedding_splitter.split_text(c) for c in first_pass], len(first_pass), repeat))
+    two_pass = [c for t in first_pass for c in embedding_splitter.split_text(t)]
+
+    # What the pipeline runs now: one sentence-aware, token-sized pass (data_ingestion/chunker.py)
+    from chunker import Chunker
+    chunker = Chunker()
+    results.append(measure("chunking_single_pass_tokens", lambda: list(chunker.chunk_documents(documents)),
+                           len(documents), repeat))
+    chunks = [c["content"] for c in chunker.chunk_documents(documents)]
+    # Embedding time and flat index size both scale with the chunk count
+    results.append({"name": "chunk_count", "two_pass": len(two_pass), "single_pass": len(chunks),
+                    "index_bytes_two_pass": len(two_pass) * EMBEDDING_DIM * 4,
+                    "index_bytes_single_pass": len(chunks) * EMBEDDING_DIM * 4})
+    print(f"  {'chunk_count':<28} {len(two_pass)} (two passes) -> {len(chunks)} (single pass)")
+    return results, chunks
+
+
+def bench_dedup(chunks, repeat):
+    from dedup import dedup_chunks
+
+    records = [{"text": c, "source": "synthetic", "original_id": i} for i, c in enumerate(chunks)]
+    result = measure("dedup_minhash_lsh", lambda: dedup_chunks(records), len(records), repeat)
+    kept, dropped = dedup_chunks(records)
+    result["kept"] = len(kept)
+    result["dropped"] = dropped
+    return [result]
+
+
+def bench_extraction(chunks, repeat):
+    try:
+        from ner_extraction import extract_entities
+    except Exception as e:
+        return [skipped("ner_extract_entities", f"spaCy model unavailable: {e}"),
+                skipped("relations_and_triples", "needs NER output")]
+    from relation_extraction import extract_relations
+    from triple_builder import build_triples
+
+    sample = chunks[:NER_SAMPLE]
+    results = [measure("ner_extract_entities", lambda: [extract_entities(c) for c in sample], len(sample), repeat)]
+    entities = [extract_entities(c) for c in sample]
+    results.append(measure("relations_and_triples",
+                           lambda: [build_triples(extract_relations(e)) for e in entities], len(entities), repeat))
+    return results
+
+
+def load_embedder():
+    try:
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(EMBEDDING_MODEL, device="cpu", local_files_only=True)
+    except Exception as e:
+        print(f"  (embedding model unavailable offline: {e})")
+        return None
+
+
+def bench_embedding(chunks, repeat):
+    model = load_embedder()
+    if model is None:
+        return [skipped("embedding_batch", "model not in local cache")], None
+    sample = chunks[:EMBED_SAMPLE]
+    result = measure("embedding_batch", lambda: model.encode(sample, batch_size=64), len(sample), repeat)
+    return [result], model
+
+
+def corpus_vectors(chunks, model):
+    # Real embeddings when the model is cached, otherwise fixed random unit vectors:
+    # FAISS cost depends on count and dimension, not on what the vectors mean.
+    if model is not None:
+        return np.asarray(model.encode(chunks, batch_size=64), dtype="float32"), "model"
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((len(chunks), EMBEDDING_DIM)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True), "random"
+
+
+def bench_faiss(vectors, metadata, repeat):
+    import faiss
+
+    def build():
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        return index
+
+    results = [measure("faiss_build_flat_l2", build, len(vectors), repeat)]
+    index = build()
+    queries = vectors[np.random.default_rng(1).integers(0, len(vectors), SEARCH_QUERIES)]
+
+    results.append(measure("faiss_search_single",
+                           lambda: [index.search(queries[i:i + 1], TOP_K) for i in range(len(queries))],
+                           len(queries), repeat))
+    results.append(measure("faiss_search_matrix", lambda: index.search(queries, TOP_K), len(queries), repeat))
+
+    # Same search fanned out over in-process shards and heap-merged
+    import tempfile
+    from vector_store import ShardedIndex, write_shards
+    with tempfile.TemporaryDirectory() as shard_dir:
+        write_shards(vectors, metadata, SHARDS, "source", shard_dir)
+        sharded = ShardedIndex(shard_dir, mode="thread", deadline=60)
+        results.append(measure(f"faiss_search_sharded_{SHARDS}", lambda: sharded.search(queries, TOP_K),
+                               len(queries), repeat))
+        sharded.close()
+
+    _, indices = index.search(queries, TOP_K)
+
+    def lookup():
+        # Same work HybridRAG.format_vector_context does per hit
+        for row in indices:
+            for idx in row:
+                if idx == -1:
+                    continue
+                entry = metadata[idx]
+                f"[Source: {os.path.basename(entry['source'])}] {entry['text'][:300]}..."
+
+    results.append(measure("metadata_lookup", lookup, indices.size, repeat))
+    return results
+
+
+def compare(current, baseline_file, tolerance):
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\n--- Comparing against {baseline_file} (tolerance {tolerance:.0%}) ---")
+    for result in current["results"]:
+        old = baseline.get(result["name"])
+        if not old or "median_s" not in old or "median_s" not in result:
+            continue
+        change = (result["median_s"] - old["median_s"]) / old["median_s"]
+        flag = "❌ REGRESSION" if change > tolerance else "✅"
+        print(f"  {result['name']:<28} {change:+7.1%} {flag}")
+        if change > tolerance:
+            regressions.append(result["name"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks for ingestion and retrieval")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", help="Previous results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown before failing")
+    args = parser.parse_args()
+
+    print("--- STARTING BENCHMARKS (offline, CPU) ---")
+    documents = generate_corpus(seed=args.seed)
+    print(f"Synthetic corpus: {len(documents)} documents (seed {args.seed})")
+
+    results, chunks = bench_chunking(documents, args.repeat)
+    metadata = [{"text": c, "source": "synthetic"} for c in chunks]
+    results += bench_dedup(chunks, args.repeat)
+    results += bench_extraction(chunks, args.repeat)
+    embed_results, model = bench_embedding(chunks, args.repeat)
+    results += embed_results
+    vectors, vector_kind = corpus_vectors(chunks, model)
+    results += bench_faiss(vectors, metadata, args.repeat)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor_count": os.cpu_count(),
+        "corpus": {"documents": len(documents), "chunks": len(chunks), "seed": args.seed, "vectors": vector_kind},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"\nResults saved to: {os.path.abspath(args.output)}")
+
+    if args.compare:
+        regressions = compare(report, args.compare, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
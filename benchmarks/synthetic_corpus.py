@@ -0,0 +1,99 @@
+import random
+
+# Fixed, offline corpus shaped like fake_enterprise_dataset (NovaTech Solutions):
+# templated emails, employee/product/ticket/project rows rendered the way
+# db_ingestion.py renders them, and multi-paragraph PDF-style reports.
+# The same seed always produces the same corpus, so timings are comparable between commits.
+
+FIRST_NAMES = ["Arjun", "Asha", "Nikhil", "Maya", "Karan", "Priya", "Rahul", "Sneha", "Vikram", "Neha",
+               "Rohan", "Ananya", "Siddharth", "Kavya", "Aditya", "Isha", "Manish", "Pooja", "Varun", "Divya"]
+LAST_NAMES = ["Mehta", "Das", "Reddy", "Kapoor", "Chopra", "Saxena", "Sharma", "Iyer", "Nair", "Gupta",
+              "Rao", "Verma", "Menon", "Bose", "Jain"]
+DESIGNATIONS = ["Software Engineer", "Senior Software Engineer", "HR Manager", "Product Manager",
+                "Data Scientist", "DevOps Engineer", "Sales Executive", "Finance Analyst", "QA Engineer"]
+DEPARTMENTS = ["Engineering", "Product", "HR", "Finance", "Sales", "Support", "Operations"]
+PRODUCTS = [("NovaPay", "Payment Gateway SaaS"), ("Insight360", "Analytics Dashboard"),
+            ("SecureID", "Identity and Access Management"), ("MarketSense", "Marketing Automation"),
+            ("CloudVault", "Encrypted Cloud Storage"), ("HelpHub", "Customer Support Desk"),
+            ("DataBridge", "ETL Integration Platform"), ("ShipFast", "Logistics Tracking")]
+CUSTOMERS = ["EduTech", "AcmeCorp", "Globex", "Initech", "Umbrella Health", "Stark Retail", "Wayne Logistics"]
+ISSUES = ["Authentication failure", "Slow dashboard load", "Payment declined", "Data sync error",
+          "Login timeout", "Report export failed", "API rate limit exceeded"]
+STATUSES = ["Open", "Closed", "In Progress"]
+SUBJECTS = ["Meeting: Roadmap discussion", "Follow-up on deployment", "Quarterly review",
+            "Customer escalation", "Budget approval", "Release planning"]
+REPORT_TOPICS = ["leave policy", "remote work guidelines", "ESG commitments", "customer service standards",
+                 "employee benefits", "information security", "quarterly performance"]
+
+
+def _person(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _email_address(name):
+    return name.lower().replace(" ", ".") + "@novatech.com"
+
+
+def make_email(rng, i):
+    sender, recipient = _person(rng), _person(rng)
+    product = rng.choice(PRODUCTS)[0]
+    body = (f"From: {_email_address(sender)}\nTo: {_email_address(recipient)}\n"
+            f"Subject: {rng.choice(SUBJECTS)}\nDate: Thu, {rng.randint(1, 28)} May 2025 "
+            f"{rng.randint(8, 19)}:{rng.randint(10, 59)}:00\n\n"
+            f"Hi {recipient.split()[0]},\n\nThis is regarding {product}.\n"
+            f"Can you share the logs for the latest deployment of {product}? "
+            f"{rng.choice(CUSTOMERS)} reported an issue last week and {_person(rng)} is following up.\n\n"
+            f"Thanks,\n{sender}\n{rng.choice(DESIGNATIONS)}")
+    return {"content": f"SOURCE: EMAIL (email_{i}.txt)\n{body}",
+            "metadata": {"source": "email_folder", "filename": f"email_{i}.txt", "type": "communication"}}
+
+
+def make_db_rows(rng, employees, tickets, projects):
+    rows = []
+    for _ in range(employees):
+        name = _person(rng)
+        rows.append((f"Employee Profile: {name} works as a {rng.choice(DESIGNATIONS)} in the "
+                     f"{rng.choice(DEPARTMENTS)} department. Email: {_email_address(name)}.", "employees"))
+    for name, description in PRODUCTS:
+        rows.append((f"Product Info: The {name} is a product described as: {description}. "
+                     f"It generates a revenue of {rng.randint(1, 20) * 1000000}.", "products"))
+    for _ in range(tickets):
+        rows.append((f"Support Ticket: Customer '{rng.choice(CUSTOMERS)}' reported an issue with "
+                     f"'{rng.choice(PRODUCTS)[0]}'. Issue details: {rng.choice(ISSUES)}. This ticket is "
+                     f"currently {rng.choice(STATUSES)} and is assigned to Agent {_email_address(_person(rng))}.",
+                     "tickets"))
+    for i in range(projects):
+        rows.append((f"Project Record: The project 'Project {i + 1}' is owned by {_person(rng)}. "
+                     f"The allocated budget is {rng.randint(50, 900) * 1000}.", "projects"))
+    return [{"content": text, "metadata": {"source": "db", "table": table}} for text, table in rows]
+
+
+def make_report_page(rng, report, page):
+    topic = rng.choice(REPORT_TOPICS)
+    paragraphs = []
+    for _ in range(rng.randint(3, 6)):
+        sentences = [
+            f"NovaTech Solutions updated its {topic} in consultation with {_person(rng)} from {rng.choice(DEPARTMENTS)}.",
+            f"The {rng.choice(PRODUCTS)[0]} team partnered with {rng.choice(CUSTOMERS)} to pilot the new process.",
+            f"Employees should contact {_person(rng)} for questions about eligibility and approvals.",
+            f"Infosys and NovaTech reviewed the results in the {rng.choice(SUBJECTS).lower()} session.",
+            f"Adoption grew by {rng.randint(2, 40)} percent compared to the previous quarter.",
+        ]
+        rng.shuffle(sentences)
+        paragraphs.append(" ".join(sentences))
+    # Repeated header/footer, like real PDF pages
+    text = f"NovaTech Solutions | Internal Report {report}\n\n" + "\n\n".join(paragraphs) + f"\n\nPage {page + 1}"
+    return {"content": text, "metadata": {"source": f"report_{report}.pdf", "page": page, "source_type": "pdf"}}
+
+
+def generate_corpus(seed=42, emails=300, employees=250, tickets=800, projects=40, reports=30, pages_per_report=5):
+    """Returns a list of {"content", "metadata"} dicts in the processed_data.json format."""
+    rng = random.Random(seed)
+    documents = []
+    for report in range(1, reports + 1):
+        for page in range(pages_per_report):
+            documents.append(make_report_page(rng, report, page))
+    documents.extend(make_db_rows(rng, employees, tickets, projects))
+    for i in range(1, emails + 1):
+        documents.append(make_email(rng, i))
+    return documents
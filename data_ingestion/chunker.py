@@ -0,0 +1,157 @@
+import re
+import time
+
+# --- CONFIGURATION ---
+TOKENIZER_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+CHUNK_TOKENS = 200      # MiniLM truncates at 256 word pieces; leave room for [CLS]/[SEP] and estimate error
+OVERLAP_TOKENS = 30     # Trailing sentences repeated at the start of the next chunk
+MIN_FILL = 0.6          # Only break early at a paragraph boundary once a chunk is this full
+
+PARAGRAPH = re.compile(r"\n\s*\n")
+# A sentence ends at . ! ? followed by whitespace and something that can start a sentence
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]?\s+(?=[A-Z0-9\"'(\[•\-])")
+WORD = re.compile(r"\w+|[^\w\s]")
+
+
+class TokenCounter:
+    """Counts word pieces with the embedding model's own tokenizer, or estimates them if it isn't cached."""
+
+    def __init__(self, name=TOKENIZER_NAME):
+        self.tokenizer = None
+        try:
+            from transformers import AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(name, local_files_only=True)
+        except Exception:
+            print("Tokenizer not in the local cache; estimating token counts.")
+
+    def count_many(self, texts):
+        if self.tokenizer is not None and texts:
+            return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False)["input_ids"]]
+        # WordPiece splits long or rare words; ~1 extra piece per 6 characters is close for English prose
+        return [sum(1 + len(w) // 6 for w in WORD.findall(t)) for t in texts]
+
+
+def sentence_spans(text):
+    """(start, end, paragraph_end) for every sentence; offsets index into `text`."""
+    spans = []
+    paragraph_start = 0
+    for paragraph_break in list(PARAGRAPH.finditer(text)) + [None]:
+        paragraph_end = paragraph_break.start() if paragraph_break else len(text)
+        start = paragraph_start
+        for match in SENTENCE_END.finditer(text, paragraph_start, paragraph_end):
+            if text[start:match.start()].strip():
+                spans.append([start, match.start() + len(match.group(0).rstrip()), False])
+            start = match.end()
+        if text[start:paragraph_end].strip():
+            spans.append([start, paragraph_end, True])
+        elif spans:
+            spans[-1][2] = True
+        paragraph_start = paragraph_break.end() if paragraph_break else len(text)
+    # Trim surrounding whitespace so offsets point at real text
+    trimmed = []
+    for start, end, is_paragraph_end in spans:
+        segment = text[start:end]
+        start += len(segment) - len(segment.lstrip())
+        end -= len(segment) - len(segment.rstrip())
+        if end > start:
+            trimmed.append((start, end, is_paragraph_end))
+    return trimmed
+
+
+def split_long(text, start, end, tokens, limit):
+    """Hard-splits one over-long sentence (tables, lists without punctuation) at whitespace."""
+    pieces = -(-tokens // limit)
+    step = (end - start) / pieces
+    cuts = [start]
+    for i in range(1, pieces):
+        cut = int(start + i * step)
+        space = text.rfind(" ", cuts[-1] + 1, cut + 1)
+        cuts.append(space if space > cuts[-1] else cut)
+    cuts.append(end)
+    return [(a, b) for a, b in zip(cuts, cuts[1:]) if text[a:b].strip()]
+
+
+class Chunker:
+    """
+    Single-pass chunker: sentences and paragraphs are packed greedily up to CHUNK_TOKENS model tokens,
+    preferring to stop at a paragraph end, with OVERLAP_TOKENS of trailing sentences carried over.
+    Each chunk is an exact slice text[start_index:end_index] of its page.
+    """
+
+    def __init__(self, chunk_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS, counter=None):
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.counter = counter or TokenCounter()
+
+    def units(self, text):
+        spans = sentence_spans(text)
+        counts = self.counter.count_many([text[s:e] for s, e, _ in spans])
+        units = []
+        for (start, end, paragraph_end), tokens in zip(spans, counts):
+            if tokens <= self.chunk_tokens:
+                units.append((start, end, tokens, paragraph_end))
+                continue
+            parts = split_long(text, start, end, tokens, self.chunk_tokens)
+            for i, (a, b) in enumerate(parts):
+                units.append((a, b, -(-tokens // len(parts)), paragraph_end and i == len(parts) - 1))
+        return units
+
+    def split(self, text):
+        """Yields (start_index, end_index, tokens) for one page/document."""
+        current = []
+        size = 0
+        fresh = False   # Does `current` hold anything beyond the carried-over overlap?
+        for unit in self.units(text):
+            if current and size + unit[2] > self.chunk_tokens:
+                yield current[0][0], current[-1][1], size
+                # Only as much overlap as still leaves room for this unit (none if it fills a chunk alone)
+                current, size = self._overlap(current, self.chunk_tokens - unit[2])
+            current.append(unit)
+            size += unit[2]
+            fresh = True
+            if unit[3] and size >= self.chunk_tokens * MIN_FILL:
+                # Paragraph boundary: clean break, no overlap needed
+                yield current[0][0], current[-1][1], size
+                current, size, fresh = [], 0, False
+        if current and fresh:
+            yield current[0][0], current[-1][1], size
+
+    def _overlap(self, units, room):
+        carried = []
+        size = 0
+        limit = min(self.overlap_tokens, room)
+        for unit in reversed(units):
+            if size + unit[2] > limit:
+                break
+            carried.insert(0, unit)
+            size += unit[2]
+        return carried, size
+
+    def chunk_documents(self, documents):
+        """
+        Streams chunk records for langchain Documents (or {"content", "metadata"} dicts).
+        Page and offsets refer to the text the loader produced for that page.
+        """
+        for doc in documents:
+            if isinstance(doc, dict):
+                text, metadata = doc.get("content", ""), doc.get("metadata", {})
+            else:
+                text, metadata = doc.page_content, doc.metadata
+            for start, end, tokens in self.split(text):
+                yield {
+                    "content": text[start:end],
+                    "metadata": dict(metadata, start_index=start, end_index=end, tokens=tokens,
+                                     chunker=f"sentence-{self.chunk_tokens}t"),
+                }
+
+
+# Quick Test
+if __name__ == "__main__":
+    sample = ("Infosys is a global leader in technology services. It serves clients in 46 countries.\n\n"
+              "Employees must apply for leave in advance. Sick leave needs a certificate after two days. " * 20)
+    chunker = Chunker()
+    start = time.perf_counter()
+    chunks = list(chunker.split(sample))
+    print(f"{len(chunks)} chunks in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for s, e, t in chunks[:3]:
+        print(f"[{s}:{e}] {t} tokens: {sample[s:e][:80]!r}")
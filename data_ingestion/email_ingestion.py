@@ -1,6 +1,41 @@
 import os
+import re
+import zlib
+from email.utils import getaddresses, parsedate_to_datetime
 from langchain_core.documents import Document
 
+HEADER = re.compile(r"^(From|To|Cc|Subject|Date):[ \t]*(.*)$", re.I)
+REPLY_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw)\s*:\s*)+", re.I)
+
+
+def parse_headers(content):
+    """Reads the From/To/Cc/Subject/Date block at the top of a plain-text email."""
+    headers = {}
+    for line in content.splitlines():
+        match = HEADER.match(line)
+        if not match:
+            break   # First blank or body line ends the header block
+        headers[match.group(1).lower()] = match.group(2).strip()
+
+    sender = [addr.lower() for _, addr in getaddresses([headers.get("from", "")]) if addr]
+    recipients = [addr.lower() for _, addr in getaddresses([headers.get("to", ""), headers.get("cc", "")]) if addr]
+    try:
+        date = parsedate_to_datetime(headers["date"]).replace(tzinfo=None).isoformat()
+    except (KeyError, TypeError, ValueError):
+        date = None
+    subject = headers.get("subject", "")
+    # Replies and forwards keep the subject (minus "Re:"/"Fwd:") and the set of people involved
+    topic = REPLY_PREFIX.sub("", subject).strip().lower()
+    participants = ",".join(sorted(set(sender + recipients)))
+    return {
+        "from": sender[0] if sender else None,
+        "to": recipients,
+        "date": date,
+        "subject": subject,
+        "thread_id": f"t{zlib.crc32(f'{topic}|{participants}'.encode('utf-8')):08x}",
+    }
+
+
 def process_emails(directory_path):
     email_docs = []
     
@@ -24,12 +59,15 @@ def process_emails(directory_path):
                     # This helps the AI distinguish between a formal PDF report and an informal email
                     final_content = f"SOURCE: EMAIL ({filename})\n{content}"
                     
+                    # Header fields travel with every chunk; the embedding pipeline
+                    # turns them into the sender/recipient/date/thread index (email_index.json)
                     doc = Document(
                         page_content=final_content,
                         metadata={
                             "source": "email_folder",
                             "filename": filename,
-                            "type": "communication"
+                            "type": "communication",
+                            "email": parse_headers(content)
                         }
                     )
                     email_docs.append(doc)
@@ -0,0 +1,179 @@
+import os
+import re
+import csv
+import json
+import unicodedata
+from collections import Counter
+
+# --- CONFIGURATION ---
+SPREADSHEET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "data", "spreadsheets")
+EMPLOYEES_CSV = os.path.join(SPREADSHEET_DIR, "employees.csv")
+PRODUCTS_CSV = os.path.join(SPREADSHEET_DIR, "products.csv")
+ALIASES_FILE = "output_4_aliases.json"
+
+MATCH_THRESHOLD = 0.75   # Trigram Jaccard needed to merge a mention into an existing entity
+NGRAM = 3
+
+# Legal-form words that don't change which organisation is meant
+CORPORATE_SUFFIXES = {"ltd", "limited", "inc", "incorporated", "corp", "corporation", "pvt", "private",
+                      "llc", "llp", "plc", "co", "company", "gmbh", "sa", "ag"}
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize(name):
+    """'INFOSYS Ltd.' / 'Infosys Limited' / 'The Infosys' -> 'infosys'"""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    text = PUNCTUATION.sub(" ", text.lower())
+    tokens = text.split()
+    if tokens and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in CORPORATE_SUFFIXES:
+        tokens = tokens[:-1]
+    return " ".join(tokens)
+
+
+def compact(key):
+    # "nova pay" and "novapay" are the same name; spacing is not a reliable signal
+    return key.replace(" ", "")
+
+
+def ngrams(key, n=NGRAM):
+    padded = f" {key} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class EntityResolver:
+    """
+    Maps raw spaCy mentions to canonical entity ids:
+    normalization -> exact key lookup -> trigram blocking -> Jaccard scoring.
+    Seeded with authoritative names so those always win as the canonical form.
+    """
+
+    def __init__(self, threshold=MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.entities = []     # id -> {"name", "label", "source", "aliases": Counter}
+        self.by_key = {}       # compact normalized key -> id
+        self.blocks = {}       # trigram -> set(ids)
+        self.grams = []        # id -> trigram set of its canonical key
+        self.stats = Counter()
+
+    @classmethod
+    def from_seed_files(cls, employees_csv=EMPLOYEES_CSV, products_csv=PRODUCTS_CSV):
+        resolver = cls()
+        for path, label in ((employees_csv, "PERSON"), (products_csv, "PRODUCT")):
+            if not os.path.exists(path):
+                print(f"Warning: seed file '{path}' not found, skipping.")
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    resolver.add_seed(row["name"], label, os.path.basename(path))
+        print(f"Entity resolver seeded with {len(resolver.entities)} canonical names.")
+        return resolver
+
+    def _new_entity(self, name, label, source, key):
+        key = compact(key)
+        entity_id = len(self.entities)
+        self.entities.append({"name": name, "label": label, "source": source, "aliases": Counter()})
+        self.by_key[key] = entity_id
+        grams = ngrams(key)
+        self.grams.append(grams)
+        for gram in grams:
+            self.blocks.setdefault(gram, set()).add(entity_id)
+        return entity_id
+
+    def add_seed(self, name, label, source):
+        key = normalize(name)
+        if key and compact(key) not in self.by_key:
+            self._new_entity(name.strip(), label, source, key)
+
+    def _best_candidate(self, grams):
+        # Blocking: only entities sharing at least one trigram are scored
+        shared = Counter()
+        for gram in grams:
+            for entity_id in self.blocks.get(gram, ()):
+                shared[entity_id] += 1
+        best_id, best_score = None, 0.0
+        for entity_id, overlap in shared.items():
+            score = overlap / (len(grams) + len(self.grams[entity_id]) - overlap)
+            if score > best_score:
+                best_id, best_score = entity_id, score
+        return best_id, best_score
+
+    def resolve(self, mention, label=None):
+        """Returns the canonical entity id for a mention, creating a new entity if nothing matches."""
+        key = normalize(mention)
+        if not key:
+            return None
+        entity_id = self.by_key.get(compact(key))
+        if entity_id is not None:
+            self.stats["exact"] += 1
+        else:
+            grams = ngrams(compact(key))
+            entity_id, score = self._best_candidate(grams)
+            if entity_id is not None and score >= self.threshold:
+                self.stats["fuzzy"] += 1
+                self.by_key[compact(key)] = entity_id   # Next time this spelling is an exact hit
+            else:
+                self.stats["new"] += 1
+                entity_id = self._new_entity(mention.strip(), label, "extracted", key)
+        self.entities[entity_id]["aliases"][mention.strip()] += 1
+        return entity_id
+
+    def canonical_name(self, entity_id):
+        return self.entities[entity_id]["name"]
+
+    def resolve_entities(self, entities):
+        """Rewrites extract_entities() output in place of raw spans: text becomes the canonical name."""
+        resolved = []
+        for ent in entities:
+            entity_id = self.resolve(ent["text"], ent["label"])
+            if entity_id is None:
+                continue
+            resolved.append({
+                "text": self.canonical_name(entity_id),
+                "label": ent["label"],
+                "mention": ent["text"],
+                "canonical_id": entity_id,
+            })
+        return resolved
+
+    def alias_table(self):
+        table = []
+        for entity_id, entity in enumerate(self.entities):
+            table.append({
+                "canonical_id": entity_id,
+                "name": entity["name"],
+                "label": entity["label"],
+                "source": entity["source"],
+                "aliases": sorted(a for a in entity["aliases"] if a != entity["name"]),
+                "mentions": sum(entity["aliases"].values()),
+            })
+        return table
+
+    def save_aliases(self, path=ALIASES_FILE):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.alias_table(), f, indent=4)
+        print(f"Saved '{path}'")
+
+    def summary(self):
+        mentions = sum(self.stats.values())
+        merged = self.stats["exact"] + self.stats["fuzzy"]
+        return {
+            "mentions": mentions,
+            "canonical_entities": len(self.entities),
+            "exact_matches": self.stats["exact"],
+            "fuzzy_matches": self.stats["fuzzy"],
+            "new_entities": self.stats["new"],
+            "merge_rate": round(merged / mentions, 3) if mentions else 0.0,
+        }
+
+
+# Quick Test
+if __name__ == "__main__":
+    resolver = EntityResolver.from_seed_files()
+    for mention in ["Infosys", "Infosys Ltd", "Infosys Limited", "INFOSYS", "NovaPay", "Nova Pay", "Arjun Mehta"]:
+        entity_id = resolver.resolve(mention, "ORG")
+        print(f"{mention!r:20} -> {entity_id} ({resolver.canonical_name(entity_id)})")
+    print(resolver.summary())
@@ -1,3 +1,10 @@
+# Must match backend/cypher_guard.py, which rewrites name CONTAINS filters into lookups on this index
+FULLTEXT_INDEX_QUERY = "CREATE FULLTEXT INDEX entity_name_fulltext IF NOT EXISTS FOR (n:Entity) ON EACH [n.name]"
+
+def ensure_indexes(connector):
+    with connector.driver.session() as session:
+        session.run(FULLTEXT_INDEX_QUERY)
+
 def load_triples(connector, triples):
     # Cypher query to create nodes and relationships
     query = """
@@ -11,4 +18,35 @@ def load_triples(connector, triples):
             try:
                 session.run(query, head=h, tail=t, relation=r)
             except Exception as e:
-                print(f"Error inserting {h}-{r}-{t}: {e}")
\ No newline at end of file
+                print(f"Error inserting {h}-{r}-{t}: {e}")
+
+    ensure_indexes(connector)
+    bump_graph_version(connector)
+
+def load_aliases(connector, alias_table):
+    # Stores the canonical id and known spellings on each entity created by load_triples
+    query = """
+    UNWIND $rows AS row
+    MATCH (e:Entity {name: row.name})
+    SET e.canonical_id = row.canonical_id, e.aliases = row.aliases
+    """
+    rows = [
+        {"name": a["name"], "canonical_id": a["canonical_id"], "aliases": a["aliases"]}
+        for a in alias_table if a["mentions"]
+    ]
+    with connector.driver.session() as session:
+        session.run(query, rows=rows)
+    bump_graph_version(connector)
+
+def bump_graph_version(connector):
+    # The backend's graph query cache (backend/graph_cache.py) drops its entries
+    # whenever this stamp changes, so call it after every write to the graph.
+    query = """
+    MERGE (m:GraphMeta {id: 'graph'})
+    SET m.version = coalesce(m.version, 0) + 1, m.updated_at = timestamp()
+    RETURN m.version AS version
+    """
+    with connector.driver.session() as session:
+        version = session.run(query).single()["version"]
+    print(f"Graph version bumped to {version}")
+    return version
@@ -11,7 +11,7 @@ except ImportError as e:
     print(f"CRITICAL ERROR: {e}", flush=True)
     exit()
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from chunker import Chunker
 
 # --- CONFIGURATION ---
 PDF_DIR = r"C:\Users\admin\Documents\NEW_INFOSYS_INTERNSHIP_PROJECT\fake_enterprise_dataset\data\pdf"
@@ -45,24 +45,17 @@ def main():
         return
 
     # 2. SPLIT DATA (Chunking)
-    # Your mentor said "ready for embedding", so we MUST chunk it now.
+    # The only chunking stage: sentence/paragraph aligned, sized in embedding-model tokens,
+    # and every chunk keeps its page and character offsets (the embedding pipeline doesn't re-split).
     print(f"\n--- Splitting {len(all_docs)} documents into chunks ---", flush=True)
     
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    splitted_docs = text_splitter.split_documents(all_docs)
+    chunker = Chunker()
+    json_data = list(chunker.chunk_documents(all_docs))   # {"content", "metadata"} dicts
     
-    print(f"--> Created {len(splitted_docs)} total chunks.", flush=True)
+    print(f"--> Created {len(json_data)} total chunks.", flush=True)
 
-    # 3. CONVERT TO JSON FORMAT
+    # 3. SAVE TO JSON
     print(f"\n--- Saving to JSON file: {OUTPUT_JSON_FILE} ---", flush=True)
-    
-    # We need to convert the complex 'Document' objects into simple Dictionaries
-    json_data = []
-    for doc in splitted_docs:
-        json_data.append({
-            "content": doc.page_content, # The text
-            "metadata": doc.metadata     # Source, page number, etc.
-        })
 
     # Write to file
     with open(OUTPUT_JSON_FILE, "w", encoding="utf-8") as f:
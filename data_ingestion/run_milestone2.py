@@ -6,7 +6,8 @@ from ner_extraction import extract_entities
 from relation_extraction import extract_relations
 from triple_builder import build_triples
 from neo4j_connection import Neo4jConnector
-from graph_loader import load_triples
+from graph_loader import load_triples, load_aliases
+from entity_resolution import EntityResolver
 
 # --- CONFIGURATION ---
 NEO4J_URI = "bolt://localhost:7687"
@@ -27,6 +28,9 @@ def main():
         return
 
     connector = Neo4jConnector(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+
+    # Maps "Infosys", "Infosys Ltd", "INFOSYS"... to one canonical entity
+    resolver = EntityResolver.from_seed_files()
     
     # --- STORAGE FOR INTERMEDIATE OUTPUTS ---
     all_entities_export = []
@@ -40,8 +44,8 @@ def main():
     for i, doc in enumerate(documents):
         text = doc["content"]
         
-        # A. NER
-        entities = extract_entities(text)
+        # A. NER + ENTITY RESOLUTION
+        entities = resolver.resolve_entities(extract_entities(text))
         # Save to export list (we add the source text ID for context)
         all_entities_export.append({
             "doc_id": i, 
@@ -79,9 +83,13 @@ def main():
         json.dump(all_triples_export, f, indent=4)
     print("Saved 'output_3_triples.json'")
 
+    resolver.save_aliases()
+    print(f"Entity resolution: {resolver.summary()}")
+
     # 4. Load into Neo4j
     print(f"\nLoading {len(all_triples_for_db)} triples into Neo4j...")
     load_triples(connector, all_triples_for_db)
+    load_aliases(connector, resolver.alias_table())
     connector.close()
     print("SUCCESS: Graph Built.")
 
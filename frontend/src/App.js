@@ -6,6 +6,8 @@ import { Send, Bot, Database, FileText, ChevronDown, ChevronUp, Loader2, BarChar
 // --- CONFIGURATION ---
 const API_URL = "http://127.0.0.1:8000/api/chat";
 const PDF_URL = "http://127.0.0.1:8000/static/"; // Base URL for PDFs
+const SERVER_URL = "http://127.0.0.1:8000"; // Citation urls are relative to the API server
+const SUGGEST_DELAY_MS = 80; // Debounce between keystrokes and /api/suggest calls
 
 function App() {
   const [messages, setMessages] = useState([
@@ -13,6 +15,11 @@ function App() {
   ]);
   const [input, setInput] = useState("");
   const [loading, setLoading] = useState(false);
+  // Server-side conversation id, so follow-up questions reuse earlier retrieval
+  const [sessionId, setSessionId] = useState(null);
+  // Name/question completions for what is being typed; `active` is the highlighted one (-1 = none)
+  const [suggestions, setSuggestions] = useState([]);
+  const [active, setActive] = useState(-1);
   
   // Dashboard Metrics State
   const [metrics, setMetrics] = useState({
@@ -28,9 +35,58 @@ function App() {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages]);
 
+  useEffect(() => {
+    if (!input.trim()) {
+      setSuggestions([]);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${SERVER_URL}/api/suggest`, { params: { q: input } });
+        if (!cancelled) {
+          setSuggestions(response.data.suggestions);
+          setActive(-1);
+        }
+      } catch (error) {
+        if (!cancelled) setSuggestions([]);
+      }
+    }, SUGGEST_DELAY_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [input]);
+
+  const applySuggestion = (suggestion) => {
+    // Replaces only the part being typed ("who manages arjun meh" -> "who manages Arjun Mehta")
+    setInput(input.slice(0, suggestion.start) + suggestion.text + (suggestion.kind === "query" ? "" : " "));
+    setSuggestions([]);
+  };
+
+  const handleKeyDown = (e) => {
+    if (suggestions.length && e.key === "ArrowDown") {
+      e.preventDefault();
+      setActive((active + 1) % suggestions.length);
+    } else if (suggestions.length && e.key === "ArrowUp") {
+      e.preventDefault();
+      setActive((active - 1 + suggestions.length) % suggestions.length);
+    } else if (e.key === "Escape") {
+      setSuggestions([]);
+    } else if (e.key === "Enter" || (e.key === "Tab" && suggestions.length)) {
+      if (active >= 0 && active < suggestions.length) {
+        e.preventDefault();
+        applySuggestion(suggestions[active]);
+      } else if (e.key === "Enter") {
+        sendMessage();
+      }
+    }
+  };
+
   const clearChat = () => {
     setMessages([{ role: "bot", text: "Chat history cleared. System ready.", thoughts: null, sources: [] }]);
     setMetrics({ latency: "0.0s", confidence: "100%", tokens: 0, total_queries: 0 });
+    setSessionId(null);
   };
 
   const sendMessage = async () => {
@@ -39,16 +95,19 @@ function App() {
     const userMsg = { role: "user", text: input };
     setMessages((prev) => [...prev, userMsg]);
     setInput("");
+    setSuggestions([]);
     setLoading(true);
 
     try {
-      const response = await axios.post(API_URL, { query: userMsg.text });
+      const response = await axios.post(API_URL, { query: userMsg.text, session_id: sessionId });
+      setSessionId(response.data.session_id);
       
       const botMsg = { 
         role: "bot", 
         text: response.data.answer, 
-        thoughts: response.data.thoughts,
-        sources: response.data.sources 
+        traceId: response.data.trace_id, // Reasoning is fetched only if the user opens it
+        sources: response.data.sources,
+        citations: response.data.citations
       };
       
       setMessages((prev) => [...prev, botMsg]);
@@ -102,7 +161,25 @@ function App() {
                 <div className="leading-relaxed whitespace-pre-wrap">{msg.text}</div>
 
                 {/* --- SOURCE LINKS (NEW) --- */}
-                {msg.role === "bot" && msg.sources && msg.sources.length > 0 && (
+                {/* Page-level excerpts: a few KB per citation instead of the whole PDF */}
+                {msg.role === "bot" && msg.citations && msg.citations.length > 0 && (
+                  <div className="mt-3 flex flex-wrap gap-2">
+                    {msg.citations.filter((c) => c.url).map((citation, i) => (
+                      <a 
+                        key={i} 
+                        href={`${SERVER_URL}${citation.url}`} 
+                        target="_blank" 
+                        rel="noopener noreferrer"
+                        className="flex items-center gap-1 bg-gray-100 hover:bg-indigo-50 text-xs text-gray-600 hover:text-indigo-600 px-2 py-1 rounded-md transition-colors border border-gray-200"
+                      >
+                        <File className="w-3 h-3" />
+                        {citation.file}{citation.page ? ` · p.${citation.page}` : ""}
+                      </a>
+                    ))}
+                  </div>
+                )}
+
+                {msg.role === "bot" && !msg.citations && msg.sources && msg.sources.length > 0 && (
                   <div className="mt-3 flex flex-wrap gap-2">
                     {msg.sources.map((source, i) => (
                       <a 
@@ -120,7 +197,7 @@ function App() {
                 )}
 
                 {/* --- REASONING ACCORDION --- */}
-                {msg.role === "bot" && msg.thoughts && <ThinkingSection thoughts={msg.thoughts} />}
+                {msg.role === "bot" && msg.traceId && <ThinkingSection traceId={msg.traceId} />}
               </div>
             </div>
           ))}
@@ -139,13 +216,28 @@ function App() {
         {/* INPUT */}
         <div className="p-5 bg-white border-t border-gray-100">
           <div className="relative flex items-center bg-gray-50 border border-gray-200 rounded-2xl px-2 focus-within:ring-2 focus-within:ring-indigo-100 transition-all">
+            {suggestions.length > 0 && (
+              <ul className="absolute bottom-full left-0 right-0 mb-2 bg-white border border-gray-200 rounded-xl shadow-lg overflow-hidden z-10">
+                {suggestions.map((suggestion, idx) => (
+                  <li
+                    key={`${suggestion.kind}-${suggestion.text}`}
+                    onMouseDown={(e) => { e.preventDefault(); applySuggestion(suggestion); }}
+                    className={`flex justify-between px-4 py-2 text-sm cursor-pointer ${idx === active ? "bg-indigo-50 text-indigo-700" : "text-gray-700 hover:bg-gray-50"}`}
+                  >
+                    <span>{suggestion.text}</span>
+                    <span className="text-xs text-gray-400 uppercase">{suggestion.kind}</span>
+                  </li>
+                ))}
+              </ul>
+            )}
             <input
               type="text"
               className="flex-1 bg-transparent border-none outline-none p-4 text-gray-700 placeholder-gray-400"
               placeholder="Ask a question..."
               value={input}
               onChange={(e) => setInput(e.target.value)}
-              onKeyPress={(e) => e.key === "Enter" && sendMessage()}
+              onKeyDown={handleKeyDown}
+              onBlur={() => setSuggestions([])}
               disabled={loading}
             />
             <button 
@@ -209,18 +301,38 @@ function StatusRow({ label, status }) {
   );
 }
 
-function ThinkingSection({ thoughts }) {
+function ThinkingSection({ traceId }) {
   const [isOpen, setIsOpen] = useState(false);
+  const [thoughts, setThoughts] = useState(null);
+  const [error, setError] = useState(null);
+
+  const toggle = async () => {
+    setIsOpen(!isOpen);
+    if (thoughts || isOpen) return;
+    setError(null);
+    try {
+      const response = await axios.get(`${SERVER_URL}/api/trace/${traceId}`);
+      setThoughts(response.data.thoughts);
+    } catch (err) {
+      setError(err.response?.status === 404 ? "Reasoning has expired for this answer." : "Could not load reasoning.");
+    }
+  };
+
   return (
     <div className="mt-4 border-t border-gray-100 pt-3">
-      <button onClick={() => setIsOpen(!isOpen)} className="flex items-center gap-2 text-xs font-semibold text-gray-500 hover:text-indigo-600 transition-colors w-full">
+      <button onClick={toggle} className="flex items-center gap-2 text-xs font-semibold text-gray-500 hover:text-indigo-600 transition-colors w-full">
         {isOpen ? <ChevronUp className="w-3 h-3" /> : <ChevronDown className="w-3 h-3" />}
         {isOpen ? "Hide Reasoning" : "View Reasoning"}
       </button>
       <AnimatePresence>
         {isOpen && (
           <motion.div initial={{ opacity: 0, height: 0 }} animate={{ opacity: 1, height: "auto" }} exit={{ opacity: 0, height: 0 }} className="overflow-hidden">
-            <div className="grid grid-cols-1 gap-3 mt-3">
+            {!thoughts && (
+              <p className="mt-3 text-xs text-gray-500 flex items-center gap-2">
+                {error || <><Loader2 className="w-3 h-3 animate-spin" /> Loading reasoning...</>}
+              </p>
+            )}
+            {thoughts && <div className="grid grid-cols-1 gap-3 mt-3">
               <div className="bg-indigo-50/50 border border-indigo-100 rounded-xl p-3">
                 <div className="flex items-center gap-2 mb-2 text-indigo-700">
                   <Database className="w-3 h-3" />
@@ -235,7 +347,16 @@ function ThinkingSection({ thoughts }) {
                 </div>
                 <p className="text-xs text-emerald-900 font-mono opacity-80 line-clamp-4">{thoughts.vector}</p>
               </div>
-            </div>
+              {thoughts.structured && (
+                <div className="bg-amber-50/50 border border-amber-100 rounded-xl p-3">
+                  <div className="flex items-center gap-2 mb-2 text-amber-700">
+                    <Database className="w-3 h-3" />
+                    <span className="text-[10px] font-bold uppercase">Structured Records</span>
+                  </div>
+                  <p className="text-xs text-amber-900 font-mono opacity-80 break-words">{thoughts.structured}</p>
+                </div>
+              )}
+            </div>}
           </motion.div>
         )}
       </AnimatePresence>